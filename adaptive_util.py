@@ -0,0 +1,138 @@
+"""
+Adaptive allocation of GAE episodes across world trees.
+
+Episodes mode plays the same number of random walks on every tree, even
+when a model takes the same path to the same ending every time. Adaptive
+mode spends the same total budget differently: every tree first plays
+min_episodes, then the remaining budget goes out in rounds of one episode
+per tree to the trees whose estimates are still the least certain, until
+each tree is within the tolerance or has played max_episodes:
+
+    sampler = AdaptiveSampler(budget_per_tree=10, min_episodes=4, tolerance=0.2)
+    for episode in sampler.add(data_id):
+        ...  # play the first episodes, then sampler.record(data_id, episode, goal_achievement)
+    for data_id, episode in sampler.next_round():
+        ...
+
+A tree has converged once the Wilson interval of both its success rate and
+its rate of reaching an ending is at most tolerance wide on either side.
+Trees end up with different numbers of episodes, so run_gae.pool_episodes
+turns the episodes of every tree into one record of expected counts and each
+tree keeps the weight it has in episodes mode.
+"""
+
+import math
+from statistics import NormalDist
+from typing import Dict, Hashable, Iterable, List, Optional, Tuple
+
+
+def wilson_half_width(successes: float, trials: float, z: float) -> float:
+    """Half the width of the Wilson score interval of successes / trials (0.5 without trials)."""
+    if trials <= 0:
+        return 0.5
+    p = successes / trials
+    spread = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials))
+    return spread / (1 + z * z / trials)
+
+
+class _TreeStats:
+    """Episode counts of one tree."""
+
+    def __init__(self):
+        self.attempts = 0  # Episodes scheduled, including failed and running ones
+        self.played = 0
+        self.reached = 0
+        self.successes = 0
+        self.next_episode = 0
+
+
+class AdaptiveSampler:
+    """Decides how many episodes each world tree plays."""
+
+    def __init__(self, budget_per_tree: int, min_episodes: int = 4, max_episodes: int = 20,
+                 tolerance: float = 0.2, confidence: float = 0.95):
+        """
+        Args:
+            budget_per_tree: Average number of episodes per tree; the total budget grows by
+                this much with every tree added
+            min_episodes: Episodes every tree plays before its estimate is checked
+            max_episodes: Episodes a single tree may play at most
+            tolerance: Half-width of the interval at which a tree has converged
+            confidence: Confidence level of the interval
+        """
+        if not 1 <= min_episodes <= max_episodes:
+            raise ValueError("Episode limits must satisfy 1 <= min_episodes <= max_episodes")
+        self.budget_per_tree = budget_per_tree
+        self.min_episodes = min_episodes
+        self.max_episodes = max_episodes
+        self.tolerance = tolerance
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.trees: Dict[Hashable, _TreeStats] = {}
+
+    @property
+    def budget(self) -> int:
+        return self.budget_per_tree * len(self.trees)
+
+    @property
+    def spent(self) -> int:
+        return sum(stats.attempts for stats in self.trees.values())
+
+    def _schedule(self, key: Hashable) -> int:
+        stats = self.trees[key]
+        stats.attempts += 1
+        stats.next_episode += 1
+        return stats.next_episode - 1
+
+    def add(self, key: Hashable, previous: Iterable[Tuple[int, Optional[int]]] = ()) -> List[int]:
+        """
+        Register a tree and schedule its first episodes.
+
+        Args:
+            key: Tree id (data_id)
+            previous: (episode, goal_achievement) of episodes already played, e.g. on resume
+
+        Returns:
+            Indices of the episodes to play now (up to min_episodes in total)
+        """
+        self.trees.setdefault(key, _TreeStats())
+        for episode, goal_achievement in previous:
+            self.record(key, episode, goal_achievement)
+        return [self._schedule(key) for _ in range(self.min_episodes - self.trees[key].attempts)]
+
+    def record(self, key: Hashable, episode: int, goal_achievement: Optional[int]) -> None:
+        """Count a finished episode; goal_achievement is None if it ended without an outcome."""
+        stats = self.trees[key]
+        stats.played += 1
+        stats.attempts = max(stats.attempts, stats.played)
+        stats.next_episode = max(stats.next_episode, episode + 1)
+        if goal_achievement is not None:
+            stats.reached += 1
+            stats.successes += goal_achievement == 2
+
+    def uncertainty(self, key: Hashable) -> float:
+        """Largest half-width of the success and ending-reached rate intervals of a tree."""
+        stats = self.trees[key]
+        return max(wilson_half_width(stats.successes, stats.played, self.z),
+                   wilson_half_width(stats.reached, stats.played, self.z))
+
+    def converged(self, key: Hashable) -> bool:
+        return self.uncertainty(key) <= self.tolerance
+
+    def next_round(self) -> List[Tuple[Hashable, int]]:
+        """
+        Schedule one more episode for every tree that needs one, most uncertain first,
+        as far as the remaining budget allows.
+
+        Returns:
+            (tree id, episode index) pairs; empty once sampling is finished
+        """
+        remaining = self.budget - self.spent
+        open_trees = [key for key, stats in self.trees.items()
+                      if stats.attempts < self.max_episodes and not self.converged(key)]
+        open_trees.sort(key=self.uncertainty, reverse=True)
+        return [(key, self._schedule(key)) for key in open_trees[:max(remaining, 0)]]
+
+    def summary(self) -> str:
+        converged = sum(self.converged(key) for key in self.trees)
+        return (f"Adaptive sampling: {self.spent} episodes on {len(self.trees)} trees (budget {self.budget}), "
+                f"{converged} converged within +/-{self.tolerance:g}")
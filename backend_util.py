@@ -0,0 +1,166 @@
+"""
+Pluggable model backends for gpt_call.
+
+openai_util.gpt_call sends prompts to the configured backend:
+
+    openai: the OpenAI-compatible API client pool in openai_util (default)
+    local:  a local Hugging Face transformers model on this machine; prompts
+            issued concurrently by the evaluators' worker pools are collected
+            into batches and generated in a single forward pass
+    stub:   a deterministic, offline backend that picks an option from the
+            prompt by hashing it, for testing the pipelines without a model
+"""
+
+import hashlib
+import json
+import queue
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future
+from typing import List, Optional, Tuple
+
+BACKENDS = ('openai', 'local', 'stub')
+
+
+class Backend(ABC):
+    """Interface for model backends used by gpt_call."""
+
+    @abstractmethod
+    def complete(self, prompt: str, model: str, temperature: float) -> str:
+        """Return the model's reply to a single-turn prompt."""
+
+    def complete_n(self, prompt: str, model: str, temperature: float, n: int) -> List[str]:
+        """Return n independently sampled replies to a single-turn prompt."""
+        return [self.complete(prompt, model, temperature) for _ in range(n)]
+
+
+class StubBackend(Backend):
+    """Deterministic offline backend answering with a hash-selected option."""
+
+    # Option lines of the evaluation prompts, e.g. "A: ..." (GAE) or "A. ..." (IAE)
+    OPTION_PATTERN = re.compile(r"^([A-Z])[:.] ", re.M)
+    OPTION_HEADERS = re.compile(r"\[选项\]|\[Options\]")
+
+    def complete(self, prompt: str, model: str, temperature: float) -> str:
+        return self._answer(prompt, model, 0)
+
+    def complete_n(self, prompt: str, model: str, temperature: float, n: int) -> List[str]:
+        return [self._answer(prompt, model, i) for i in range(n)]
+
+    def _answer(self, prompt: str, model: str, sample: int) -> str:
+        options = self.OPTION_PATTERN.findall(self.OPTION_HEADERS.split(prompt)[-1]) or ["A"]
+        # Further samples of the same prompt hash differently so votes can disagree
+        seed = f"{model}\n{prompt}" if sample == 0 else f"{model}\n{prompt}\n{sample}"
+        digest = hashlib.sha256(seed.encode('utf-8')).digest()
+        choice = options[int.from_bytes(digest[:4], "big") % len(options)]
+        return json.dumps({"explaination": "stub backend", "choice": choice}, ensure_ascii=False)
+
+
+class TransformersBackend(Backend):
+    """
+    Local inference with Hugging Face transformers and dynamic batching.
+
+    Calls from several threads are queued; a background thread takes up to
+    batch_size prompts (waiting at most max_wait seconds for a batch to
+    fill) and generates replies for all of them in one forward pass.
+    """
+
+    def __init__(self, model_path: str, batch_size: int = 8, max_wait: float = 0.05,
+                 max_new_tokens: int = 512, device: str = "cpu"):
+        """
+        Args:
+            model_path: Hugging Face model id or local path
+            batch_size: Maximum number of prompts generated together
+            max_wait: Seconds to wait for more prompts before running a partial batch
+            max_new_tokens: Generation length limit
+            device: Torch device to run on
+        """
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self._torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(model_path)
+        # Left padding keeps every prompt's end aligned for batched generation
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = AutoModelForCausalLM.from_pretrained(model_path).to(device).eval()
+        self.device = device
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_new_tokens = max_new_tokens
+        self._queue: "queue.Queue[Tuple[str, float, Future]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def complete(self, prompt: str, model: str, temperature: float) -> str:
+        return self.complete_n(prompt, model, temperature, 1)[0]
+
+    def complete_n(self, prompt: str, model: str, temperature: float, n: int) -> List[str]:
+        # Queue all samples at once so they land in the same generate batch
+        futures = [Future() for _ in range(n)]
+        for future in futures:
+            self._queue.put((prompt, temperature, future))
+        return [future.result() for future in futures]
+
+    def _run(self) -> None:
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            # Sampling settings are per generate call, so batch by temperature
+            groups = {}
+            for request in batch:
+                groups.setdefault(request[1], []).append(request)
+            for temperature, requests in groups.items():
+                try:
+                    replies = self.generate([prompt for prompt, _, _ in requests], temperature)
+                except Exception as e:
+                    for _, _, future in requests:
+                        future.set_exception(e)
+                    continue
+                for (_, _, future), reply in zip(requests, replies):
+                    future.set_result(reply)
+
+    def generate(self, prompts: List[str], temperature: float) -> List[str]:
+        """Generate replies for a batch of prompts in one forward pass."""
+        if self.tokenizer.chat_template:
+            texts = [self.tokenizer.apply_chat_template([{"role": "user", "content": p}], tokenize=False,
+                                                        add_generation_prompt=True) for p in prompts]
+        else:
+            texts = list(prompts)
+        inputs = self.tokenizer(texts, return_tensors="pt", padding=True).to(self.device)
+        sampling = {"do_sample": True, "temperature": temperature} if temperature > 0 else {"do_sample": False}
+        with self._torch.no_grad():
+            output = self.model.generate(**inputs, max_new_tokens=self.max_new_tokens,
+                                         pad_token_id=self.tokenizer.pad_token_id, **sampling)
+        return self.tokenizer.batch_decode(output[:, inputs["input_ids"].shape[1]:], skip_special_tokens=True)
+
+
+def create_backend(name: str, model_path: Optional[str] = None, batch_size: int = 8,
+                   device: str = "cpu") -> Optional[Backend]:
+    """
+    Create a backend by name.
+
+    Returns:
+        The backend, or None for 'openai' (gpt_call's built-in API client)
+    """
+    if name == 'openai':
+        return None
+    if name == 'stub':
+        return StubBackend()
+    if name == 'local':
+        if not model_path:
+            raise ValueError("The local backend requires a model path")
+        return TransformersBackend(model_path, batch_size=batch_size, device=device)
+    raise ValueError(f"Backend must be one of {BACKENDS}")
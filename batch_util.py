@@ -0,0 +1,123 @@
+"""
+Provider batch API submission for prompts known ahead of time.
+
+All IAE prompts and the root decision prompt of every GAE episode are
+known before any response arrives. submit_batch writes them to a batch
+job file in the OpenAI batch format, uploads it, polls the job until it
+finishes and returns the responses; prefill_from_batch hands them to
+gpt_call, which answers those prompts from the batch results instead of
+issuing synchronous requests. The endpoint is taken from the openai_util
+client pool, so OPENAI_BASE_URL can point at a local mock batch server.
+"""
+
+import json
+import os
+import tempfile
+import time
+from typing import List, Optional
+
+from log_util import logger
+from openai_util import get_pool, prefill_responses
+from prefix_util import Prompt, message_content, prompt_text
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+FINAL_STATUSES = ("completed", "failed", "expired", "cancelled")
+
+
+def write_batch_file(path: str, prompts: List[Prompt], model: str, temperature: float = 1) -> None:
+    """Write one chat completion request per prompt, with its index as custom_id."""
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, prompt in enumerate(prompts):
+            f.write(json.dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": {
+                    "model": model,
+                    "temperature": temperature,
+                    "messages": [{"role": "user", "content": message_content(prompt)}],
+                },
+            }, ensure_ascii=False) + "\n")
+
+
+def parse_batch_output(text: str, count: int) -> List[Optional[str]]:
+    """Map a batch output file back to the prompt order; failed requests become None."""
+    responses: List[Optional[str]] = [None] * count
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        result = json.loads(line)
+        response = result.get("response") or {}
+        if response.get("status_code") != 200:
+            continue
+        try:
+            responses[int(result["custom_id"])] = response["body"]["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, ValueError, TypeError):
+            continue
+    return responses
+
+
+def submit_batch(prompts: List[Prompt], model: str, temperature: float = 1,
+                 poll_interval: float = 30.0) -> List[Optional[str]]:
+    """
+    Run prompts through the provider's batch API and wait for the results.
+
+    Args:
+        prompts: Prompts to send, one request each
+        model: Model name
+        temperature: Sampling temperature
+        poll_interval: Seconds between job status checks
+
+    Returns:
+        Responses aligned with prompts (None where the request failed)
+    """
+    if not prompts:
+        return []
+    client = get_pool().endpoints[0].client
+
+    fd, path = tempfile.mkstemp(prefix="socialeval_batch_", suffix=".jsonl")
+    os.close(fd)
+    try:
+        write_batch_file(path, prompts, model, temperature)
+        with open(path, 'rb') as f:
+            input_file = client.files.create(file=f, purpose="batch")
+    finally:
+        os.remove(path)
+
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                  completion_window="24h")
+    logger.info("Submitted batch %s with %d requests", batch.id, len(prompts))
+
+    while batch.status not in FINAL_STATUSES:
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+        counts = getattr(batch, "request_counts", None)
+        if counts is not None:
+            logger.info("Batch %s: %s (%s/%s completed)", batch.id, batch.status, counts.completed, counts.total)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        logger.warning("Batch %s ended with status %s; falling back to direct requests", batch.id, batch.status)
+        return [None] * len(prompts)
+
+    responses = parse_batch_output(client.files.content(batch.output_file_id).text, len(prompts))
+    failed = sum(response is None for response in responses)
+    if failed:
+        logger.warning("Batch %s: %d requests failed and will be sent directly", batch.id, failed)
+    return responses
+
+
+def prefill_from_batch(prompts: List[Prompt], model: str, temperature: float = 1,
+                       poll_interval: float = 30.0, seeds: Optional[List[Optional[int]]] = None) -> None:
+    """
+    Answer prompts through the batch API and queue the answers for gpt_call.
+
+    seeds (aligned with prompts) are the call seeds of the items that will
+    ask them (see seed_util), so every answer goes to the item it was
+    requested for. They are not sent with the batch requests: an item that
+    samples a prompt several times must get independent answers.
+    """
+    responses = submit_batch(prompts, model, temperature, poll_interval)
+    seeds = seeds or [None] * len(prompts)
+    answered = [i for i, response in enumerate(responses) if response is not None]
+    prefill_responses(model, [(prompt_text(prompts[i]), responses[i]) for i in answered], temperature,
+                      [seeds[i] for i in answered])
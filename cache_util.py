@@ -0,0 +1,165 @@
+"""
+Persistent response cache for model calls.
+
+Responses are stored in a SQLite database keyed by a hash of
+(model, prompt, temperature, slot). The cache supports two modes:
+
+    sample: the n-th identical request of an item maps to slot n, so
+            repeated prompts (e.g. the root decision of every GAE episode)
+            still get independent samples, while a re-run replays them.
+            Requests are also keyed by the call seed when one is set (see
+            seed_util), or otherwise by the evaluation item making the
+            call (see cache_scope).
+    replay: every identical request maps to slot 0 and reuses the first
+            cached answer, whatever the item or seed; use this when
+            sampling is not needed.
+
+Slots are counted per item rather than per run, so a resumed run that
+skips finished items still gives every remaining item its own answers:
+
+    with cache_scope(data_id, episode):
+        run_episode(tree, model_name)
+"""
+
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+CACHE_MODES = ('sample', 'replay')
+
+_scope: contextvars.ContextVar = contextvars.ContextVar("cache_scope", default=None)
+
+
+@contextmanager
+def cache_scope(*keys):
+    """Key the cached responses of the calls made inside the block by an item (data_id, episode, ...)."""
+    token = _scope.set(list(keys))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+def current_scope() -> Optional[Tuple]:
+    """Item keys attached to model calls in the current context, or None."""
+    scope = _scope.get()
+    return tuple(scope) if scope is not None else None
+
+
+class ResponseCache:
+    """Content-addressed on-disk cache with size-based LRU eviction."""
+
+    def __init__(self, path: str, mode: str = 'sample', max_bytes: Optional[int] = None):
+        """
+        Args:
+            path: Path to the SQLite cache file
+            mode: 'sample' or 'replay' (see module docstring)
+            max_bytes: Evict least recently used responses once the cached
+                responses exceed this many bytes (None for no limit)
+        """
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Cache mode must be one of {CACHE_MODES}")
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.mode = mode
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._occurrences: Dict[str, int] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, "
+            "size INTEGER, last_access REAL)"
+        )
+        self._conn.commit()
+        self._total_bytes = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def key(self, model: str, prompt: str, temperature: float, seed: Optional[int] = None,
+            scope: Optional[Tuple] = None) -> str:
+        """
+        Compute the cache key for a request.
+
+        In 'sample' mode every call with the same request advances its slot,
+        so the key must be computed exactly once per model call. Seeded
+        requests are keyed by their seed, which is derived per item, and
+        unseeded ones by the item scope (see cache_scope), so their slots do
+        not depend on which other items ran before them in this process.
+        In 'replay' mode both are ignored, so each prompt is answered once:
+
+        >>> import os, tempfile
+        >>> cache = ResponseCache(os.path.join(tempfile.mkdtemp(), 'cache.db'), mode='replay')
+        >>> cache.key('m', 'p', 1.0, seed=1, scope=(0, 0)) == cache.key('m', 'p', 1.0, seed=2, scope=(0, 1))
+        True
+        """
+        request = [model, prompt, temperature]
+        if self.mode == 'sample':
+            if seed is not None:
+                request.append(seed)
+            elif scope is not None:
+                request.append(list(scope))
+        base = json.dumps(request, ensure_ascii=False)
+        digest = hashlib.sha256(base.encode('utf-8')).hexdigest()
+        slot = 0
+        if self.mode == 'sample':
+            with self._lock:
+                slot = self._occurrences.get(digest, 0)
+                self._occurrences[digest] = slot + 1
+        return f"{digest}:{slot}"
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key: str, model: str, response: str) -> None:
+        """Store a response, evicting old entries if the size limit is exceeded."""
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?)", (key, model, response, size, time.time()))
+            self._total_bytes += size
+            if self.max_bytes is not None and self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop least recently used entries until the cache is under 90% of its limit."""
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._total_bytes -= size
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,97 @@
+"""
+Incremental JSONL checkpoints for long evaluation runs.
+
+The first line of a checkpoint file holds the run configuration
+({"meta": {...}}); every following line is one finished record (a GAE
+episode or an IAE item). Records are flushed as soon as they are written,
+so an interrupted run can be resumed from the last completed record.
+"""
+
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+
+def read_records(path: str) -> List[Dict]:
+    """
+    Read the records of a checkpoint file, skipping the meta line and any
+    line left incomplete by an interrupted write.
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "meta" in record:
+                continue
+            records.append(record)
+    return records
+
+
+def read_meta(path: str) -> Optional[Dict]:
+    """Return the run configuration stored in a checkpoint file, if any."""
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            first = json.loads(f.readline())
+        except json.JSONDecodeError:
+            return None
+    return first.get("meta") if isinstance(first, dict) else None
+
+
+class Checkpoint:
+    """Append-only JSONL writer for finished evaluation records."""
+
+    def __init__(self, path: str, meta: Dict, resume: bool = False):
+        """
+        Args:
+            path: Path to the JSONL checkpoint file
+            meta: Run configuration; resuming requires the stored one to match
+            resume: Load records from an existing file instead of starting over
+        """
+        self.path = path
+        self.records: List[Dict] = []
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            stored = read_meta(path)
+            if stored is not None and stored != meta:
+                raise ValueError(f"Checkpoint {path} was written by a different run configuration: {stored}")
+            self.records = read_records(path)
+            # Terminate a line left incomplete by an interrupted write
+            needs_newline = False
+            if os.path.getsize(path) > 0:
+                with open(path, 'rb') as f:
+                    f.seek(-1, os.SEEK_END)
+                    needs_newline = f.read(1) != b"\n"
+            self._file = open(path, 'a', encoding='utf-8')
+            if needs_newline:
+                self._file.write("\n")
+            if stored is None:
+                self._write_line({"meta": meta})
+        else:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(path, 'w', encoding='utf-8')
+            self._write_line({"meta": meta})
+
+    def _write_line(self, obj: Dict) -> None:
+        self._file.write(json.dumps(obj, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def write(self, record: Dict) -> None:
+        """Persist a finished record."""
+        with self._lock:
+            self._write_line(record)
+            self.records.append(record)
+
+    def close(self) -> None:
+        """Close the checkpoint file."""
+        with self._lock:
+            self._file.close()
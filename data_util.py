@@ -0,0 +1,291 @@
+"""
+Streaming loaders for the worldtree and interpersonal ability data files.
+
+Entries are yielded one at a time and projected to the requested language,
+so only a single entry is held in memory. Three layouts are supported:
+
+    *.jsonl: one entry per line
+    *.json:  a top-level array of entries, parsed incrementally when the
+             optional ijson package is installed (pip install ijson) and
+             loaded in one piece otherwise
+    compiled: the binary format written by `compile` (see CompiledDataset),
+             read through a memory map with random access by data_id
+
+Usage:
+    python data_util.py to_jsonl <input.json> <output.jsonl> [--lang cn]
+    python data_util.py compile <input.json> <output.sevdb>
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def project_entry(entry: Dict, lang: Optional[str]) -> Dict:
+    """Keep only the data_id and the requested language's data of an entry."""
+    if lang is None:
+        return entry
+    data_key = f"{lang}_data"
+    projected = {key: value for key, value in entry.items() if not key.endswith("_data")}
+    if data_key in entry:
+        projected[data_key] = entry[data_key]
+    return projected
+
+
+# Compiled format: MAGIC, then the offset and length of the index (uint64,
+# little endian), then one zlib-compressed compact JSON blob per entry and
+# language, then the zlib-compressed JSON index.
+COMPILED_MAGIC = b"SEVALDB1"
+_HEADER = struct.Struct("<8sQQ")
+
+
+def shard_of(data_id: Any, num_shards: int) -> int:
+    """Return the shard an entry belongs to, stable across processes and machines."""
+    return zlib.crc32(str(data_id).encode('utf-8')) % num_shards
+
+
+def is_compiled(data_path: str) -> bool:
+    """Check whether a data file is in the compiled binary format."""
+    with open(data_path, 'rb') as f:
+        return f.read(len(COMPILED_MAGIC)) == COMPILED_MAGIC
+
+
+def compile_dataset(data_path: str, output_path: str) -> int:
+    """
+    Convert a .json/.jsonl data file to the compiled binary format.
+
+    Every language of an entry is stored as a separate blob, so readers only
+    decode the language they ask for.
+
+    Returns:
+        Number of entries written
+    """
+    index = []
+    with open(output_path, 'wb') as f:
+        f.write(_HEADER.pack(COMPILED_MAGIC, 0, 0))
+        for entry in iter_entries(data_path):
+            record = {"fields": {}, "blobs": {}}
+            for key, value in entry.items():
+                if key.endswith("_data"):
+                    blob = zlib.compress(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+                    record["blobs"][key[:-len("_data")]] = [f.tell(), len(blob)]
+                    f.write(blob)
+                else:
+                    record["fields"][key] = value
+            index.append(record)
+
+        index_offset = f.tell()
+        blob = zlib.compress(json.dumps(index, ensure_ascii=False).encode('utf-8'))
+        f.write(blob)
+        f.seek(0)
+        f.write(_HEADER.pack(COMPILED_MAGIC, index_offset, len(blob)))
+    return len(index)
+
+
+class CompiledDataset:
+    """Memory-mapped reader for compiled data files with random access by data_id."""
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path to a file written by compile_dataset
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, index_offset, index_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != COMPILED_MAGIC:
+            raise ValueError(f"{path} is not a compiled data file")
+        self._index: List[Dict] = json.loads(
+            zlib.decompress(self._mmap[index_offset:index_offset + index_length]))
+        self._positions = {record["fields"].get("data_id"): i for i, record in enumerate(self._index)}
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def data_ids(self) -> List[Any]:
+        """Return every data_id in dataset order."""
+        return [record["fields"].get("data_id") for record in self._index]
+
+    def _build(self, record: Dict, lang: Optional[str]) -> Dict:
+        entry = dict(record["fields"])
+        for blob_lang, (offset, length) in record["blobs"].items():
+            if lang is None or blob_lang == lang:
+                entry[f"{blob_lang}_data"] = json.loads(zlib.decompress(self._mmap[offset:offset + length]))
+        return entry
+
+    def get(self, data_id: Any, lang: Optional[str] = None) -> Dict:
+        """
+        Return a single entry, decoding only the requested language.
+
+        Raises:
+            KeyError: If no entry has this data_id
+        """
+        return self._build(self._index[self._positions[data_id]], lang)
+
+    def _select(self, data_ids: Optional[Iterable[Any]], shard: int, num_shards: int) -> Iterator[Dict]:
+        """Yield the index records of the selected entries in dataset order."""
+        wanted = None if data_ids is None else {str(data_id) for data_id in data_ids}
+        for record in self._index:
+            data_id = record["fields"].get("data_id")
+            if wanted is not None and str(data_id) not in wanted:
+                continue
+            if num_shards > 1 and shard_of(data_id, num_shards) != shard:
+                continue
+            yield record
+
+    def iter_entries(self, lang: Optional[str] = None, data_ids: Optional[Iterable[Any]] = None,
+                     shard: int = 0, num_shards: int = 1) -> Iterator[Dict]:
+        """
+        Yield entries in dataset order.
+
+        If data_ids or a shard is given, only the selected entries (matched by
+        str(data_id)) are decoded; the rest of the file is never touched.
+        """
+        for record in self._select(data_ids, shard, num_shards):
+            yield self._build(record, lang)
+
+    def count(self, data_ids: Optional[Iterable[Any]] = None, shard: int = 0, num_shards: int = 1) -> int:
+        """Count the selected entries from the index alone."""
+        return sum(1 for _ in self._select(data_ids, shard, num_shards))
+
+    def close(self) -> None:
+        """Release the memory map."""
+        self._mmap.close()
+        self._file.close()
+
+
+def _iter_raw_entries(data_path: str) -> Iterator[Dict]:
+    """Yield the entries of a data file without projecting them."""
+    if data_path.endswith(".jsonl"):
+        with open(data_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif ijson is not None:
+        with open(data_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    else:
+        with open(data_path, 'r', encoding='utf-8') as f:
+            data_list = json.load(f)
+        # Release entries as they are consumed
+        data_list.reverse()
+        while data_list:
+            yield data_list.pop()
+
+
+def iter_entries(data_path: str, lang: Optional[str] = None, data_ids: Optional[Iterable[Any]] = None,
+                 shard: int = 0, num_shards: int = 1) -> Iterator[Dict]:
+    """
+    Stream the entries of a data file.
+
+    Args:
+        data_path: Path to a .json, .jsonl or compiled data file
+        lang: Language to keep ('cn' or 'en'); None keeps every language
+        data_ids: Only yield entries whose str(data_id) is in this collection (optional)
+        shard: Index of the shard to yield, see shard_of
+        num_shards: Total number of shards the dataset is split into
+
+    Returns:
+        Iterator over entries holding the data_id and the '{lang}_data' field
+    """
+    if not os.path.exists(data_path):
+        raise ValueError(f"Data file {data_path} does not exist")
+    if not 0 <= shard < num_shards:
+        raise ValueError(f"Shard index must be in [0, {num_shards})")
+
+    if is_compiled(data_path):
+        dataset = CompiledDataset(data_path)
+        try:
+            yield from dataset.iter_entries(lang, data_ids, shard, num_shards)
+        finally:
+            dataset.close()
+        return
+
+    wanted = None if data_ids is None else {str(data_id) for data_id in data_ids}
+    entries = _iter_raw_entries(data_path)
+    while True:
+        try:
+            entry = next(entries)
+        except StopIteration:
+            return
+        except Exception as e:
+            raise ValueError(f"Error loading data file: {e}")
+        if wanted is not None and str(entry.get("data_id")) not in wanted:
+            continue
+        if num_shards > 1 and shard_of(entry.get("data_id"), num_shards) != shard:
+            continue
+        yield project_entry(entry, lang)
+
+
+def count_entries(data_path: str, data_ids: Optional[Iterable[Any]] = None, shard: int = 0,
+                  num_shards: int = 1) -> Optional[int]:
+    """
+    Count the entries iter_entries would yield, if that is cheap.
+
+    Returns:
+        The count for compiled files and unfiltered .jsonl files, None otherwise
+    """
+    if is_compiled(data_path):
+        dataset = CompiledDataset(data_path)
+        try:
+            return dataset.count(data_ids, shard, num_shards)
+        finally:
+            dataset.close()
+    if data_path.endswith(".jsonl") and data_ids is None and num_shards == 1:
+        with open(data_path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+    return None
+
+
+def to_jsonl(data_path: str, output_path: str, lang: Optional[str] = None) -> int:
+    """
+    Convert a data file to JSONL, optionally keeping a single language.
+
+    Returns:
+        Number of entries written
+    """
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for entry in iter_entries(data_path, lang):
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SocialEval data file utilities')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('to_jsonl', help='Convert a JSON data file to JSONL')
+    convert.add_argument('data_path', type=str, help='Input .json or .jsonl data file')
+    convert.add_argument('output', type=str, help='Output .jsonl file')
+    convert.add_argument('--lang', type=str, default=None, choices=['cn', 'en'],
+                         help='Keep only this language (optional)')
+
+    compile_parser = subparsers.add_parser('compile', help='Compile a data file to the indexed binary format')
+    compile_parser.add_argument('data_path', type=str, help='Input .json or .jsonl data file')
+    compile_parser.add_argument('output', type=str, help='Output compiled file (e.g. worldtree.sevdb)')
+
+    args = parser.parse_args()
+
+    if args.command == 'to_jsonl':
+        count = to_jsonl(args.data_path, args.output, args.lang)
+        print(f"Wrote {count} entries to {args.output}")
+    elif args.command == 'compile':
+        count = compile_dataset(args.data_path, args.output)
+        print(f"Compiled {count} entries to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+"""
+Dry-run prompt compilation and request/token budget estimates.
+
+Builds every IAE prompt and every GAE decision prompt reachable from the
+root of each world tree, exactly as the evaluators would send them, without
+calling a model, and counts their tokens with a local tokenizer:
+
+    tiktoken:  tiktoken's encoding for the API models (pip install tiktoken);
+               'tiktoken:<encoding>' picks another encoding
+    chars:     the rough character-based estimate used for rate limiting
+    <path>:    any other value is loaded as a Hugging Face tokenizer
+
+GAE episodes follow model choices, so their cost is reported as a range:
+min and max follow the cheapest and most expensive path through every
+tree, and expected assumes a model choosing uniformly at random. Request
+durations are estimated from a per-request latency, the concurrency and
+optional rate limits. Re-asks for unparsable answers are not included.
+
+Usage:
+    python estimate_util.py --gae_data_path <path> --iae_data_path <path> [--concurrency 8] [--price_prompt 2.5]
+"""
+
+import argparse
+import json
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+from data_util import iter_entries
+from log_util import add_logging_arguments, apply_logging_arguments, format_duration, logger
+from openai_util import estimate_tokens
+from prefix_util import PROMPT_LAYOUTS, prompt_text
+from run_gae import EPISODE_MODES, NUM_EPISODES, build_prompt
+from run_iae import build_item
+from worldtree import WorldTree
+
+DEFAULT_ENCODING = "o200k_base"
+
+# Budgets are reported for the cheapest path, a uniformly random model and the most expensive path
+BOUNDS = ('min', 'expected', 'max')
+
+
+def load_tokenizer(name: str = 'tiktoken') -> Callable[[str], int]:
+    """
+    Return a function counting the tokens of a prompt.
+
+    Args:
+        name: 'tiktoken', 'tiktoken:<encoding>', 'chars', or a Hugging Face tokenizer id or path
+    """
+    if name == 'chars':
+        return estimate_tokens
+    if name.startswith('tiktoken'):
+        if tiktoken is None:
+            logger.warning("tiktoken is not installed (pip install tiktoken); using character-based estimates")
+            return estimate_tokens
+        encoding = tiktoken.get_encoding(name.partition(':')[2] or DEFAULT_ENCODING)
+        return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+    from transformers import AutoTokenizer
+
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+class Budget:
+    """Requests and tokens needed for part of a run."""
+
+    def __init__(self, requests: float = 0.0, prompt_tokens: float = 0.0, completion_tokens: float = 0.0):
+        self.requests = requests
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = completion_tokens
+
+    def __add__(self, other: "Budget") -> "Budget":
+        return Budget(self.requests + other.requests, self.prompt_tokens + other.prompt_tokens,
+                      self.completion_tokens + other.completion_tokens)
+
+    def __mul__(self, factor: float) -> "Budget":
+        return Budget(self.requests * factor, self.prompt_tokens * factor, self.completion_tokens * factor)
+
+    @staticmethod
+    def combine(budgets: List["Budget"], pick: Callable) -> "Budget":
+        """Combine alternative budgets field by field, e.g. with min, max or a mean."""
+        return Budget(pick([b.requests for b in budgets]), pick([b.prompt_tokens for b in budgets]),
+                      pick([b.completion_tokens for b in budgets]))
+
+    def cost(self, price_prompt: Optional[float], price_completion: Optional[float]) -> float:
+        """Cost in USD given prices per million tokens."""
+        return (self.prompt_tokens * (price_prompt or 0) + self.completion_tokens * (price_completion or 0)) / 1e6
+
+    def duration(self, concurrency: int, latency: float, rpm: Optional[float] = None,
+                 tpm: Optional[float] = None) -> float:
+        """Seconds needed with `concurrency` requests in flight, bounded by the rate limits."""
+        seconds = self.requests * latency / max(concurrency, 1)
+        if rpm:
+            seconds = max(seconds, self.requests / rpm * 60)
+        if tpm:
+            seconds = max(seconds, (self.prompt_tokens + self.completion_tokens) / tpm * 60)
+        return seconds
+
+
+def _mean(values: List[float]) -> float:
+    return sum(values) / len(values)
+
+
+def estimate_tree(tree: WorldTree, count_tokens: Callable[[str], int], mode: str = 'episodes',
+                  samples: int = 1, completion_tokens: int = 150,
+                  prompt_layout: str = 'default', skip_forced: bool = False) -> Tuple[Dict[str, Budget], Dict]:
+    """
+    Compile every reachable decision prompt of a world tree and estimate its budget.
+
+    Args:
+        tree: The world tree
+        count_tokens: Token counter from load_tokenizer
+        mode: 'episodes' or 'adaptive' for the budget of one episode, 'enumerate' for one
+            enumerate_tree traversal
+        samples: Samples per request (num_samples, or samples_per_node in enumerate mode)
+        completion_tokens: Expected completion tokens per sample
+        prompt_layout: 'default' or 'prefix' (see run_gae.build_prompt)
+        skip_forced: Leave out the decisions run_gae --skip_forced answers without the model
+
+    Returns:
+        Tuple of (budget per bound in BOUNDS, stats with the number of decision prompts
+        and the size of the largest one)
+    """
+    stats = {'prompts': 0, 'max_prompt_tokens': 0}
+    # Chance that a uniformly random model picks a given option at least once in `samples` draws
+    picked = {}
+
+    def visit(path: Tuple[int, ...]) -> Dict[str, Budget]:
+        """Budget of the rest of an episode (or traversal) from path."""
+        main, main_str, others, dialogue, choices, nexts, goal_achieve, cat = tree.state(path)
+        if goal_achieve != -1 or not choices or not nexts:
+            return {bound: Budget() for bound in BOUNDS}
+        if skip_forced:
+            info = tree.index.nodes[path[-1]]
+            if info.determined:
+                return {bound: Budget() for bound in BOUNDS}
+            if info.forced and nexts[0] not in path:
+                return visit(path + (nexts[0],))
+
+        tokens = count_tokens(prompt_text(build_prompt(main, others, dialogue, choices, prompt_layout)))
+        stats['prompts'] += 1
+        stats['max_prompt_tokens'] = max(stats['max_prompt_tokens'], tokens)
+        own = Budget(1, tokens, samples * completion_tokens)
+
+        # Revisiting a cid is a dead end for the evaluators as well
+        branches = [path + (cid,) for cid in nexts if cid not in path]
+        if not branches:
+            return {bound: own for bound in BOUNDS}
+        if len(nexts) not in picked:
+            picked[len(nexts)] = 1 - (1 - 1 / len(nexts)) ** samples
+        p = picked[len(nexts)]
+        children = [visit(child) for child in branches]
+
+        if mode != 'enumerate':
+            # One episode follows a single branch
+            return {
+                'min': own + Budget.combine([c['min'] for c in children], min),
+                'expected': own + Budget.combine([c['expected'] for c in children], _mean),
+                'max': own + Budget.combine([c['max'] for c in children], max),
+            }
+        # A traversal queries every branch that received at least one sample
+        return {
+            'min': own + Budget.combine([c['min'] for c in children], min),
+            'expected': own + Budget.combine([c['expected'] for c in children], lambda v: sum(v) * p),
+            'max': own + Budget.combine([c['max'] for c in children], sum),
+        }
+
+    return visit((0,)), stats
+
+
+def estimate_gae(data_path: str, count_tokens: Callable[[str], int], lang: str = 'cn', mode: str = 'episodes',
+                 num_samples: int = 1, samples_per_node: int = 1, completion_tokens: int = 150,
+                 prompt_layout: str = 'default', data_ids: Optional[List[str]] = None, shard: int = 0,
+                 num_shards: int = 1, skip_forced: bool = False) -> Tuple[Dict[str, Budget], Dict]:
+    """
+    Estimate the budget of a GAE run over a worldtree data file.
+
+    Returns:
+        Tuple of (budget per bound, stats with 'trees', 'prompts' and 'max_prompt_tokens')
+    """
+    if mode not in EPISODE_MODES:
+        raise ValueError(f"Mode must be one of {EPISODE_MODES}")
+    totals = {bound: Budget() for bound in BOUNDS}
+    stats = {'trees': 0, 'prompts': 0, 'max_prompt_tokens': 0}
+    # Adaptive mode spends at most NUM_EPISODES per tree on average
+    runs = 1 if mode == 'enumerate' else NUM_EPISODES
+    samples = samples_per_node if mode == 'enumerate' else num_samples
+
+    for entry in iter_entries(data_path, lang, data_ids, shard, num_shards):
+        data_key = f"{lang}_data"
+        if data_key not in entry:
+            logger.warning("%s not found in entry %s", data_key, entry.get('data_id', 'unknown'))
+            continue
+        try:
+            budget, tree_stats = estimate_tree(WorldTree(entry[data_key]), count_tokens, mode, samples,
+                                               completion_tokens, prompt_layout, skip_forced)
+        except Exception as e:
+            logger.error("Error processing entry %s: %s", entry.get('data_id', 'unknown'), e)
+            continue
+        for bound in BOUNDS:
+            totals[bound] = totals[bound] + budget[bound] * runs
+        stats['trees'] += 1
+        stats['prompts'] += tree_stats['prompts']
+        stats['max_prompt_tokens'] = max(stats['max_prompt_tokens'], tree_stats['max_prompt_tokens'])
+    return totals, stats
+
+
+def estimate_iae(data_path: str, count_tokens: Callable[[str], int], lang: str = 'cn', num_samples: int = 1,
+                 completion_tokens: int = 150, prompt_layout: str = 'default', data_ids: Optional[List[str]] = None,
+                 shard: int = 0, num_shards: int = 1) -> Tuple[Dict[str, Budget], Dict]:
+    """
+    Estimate the budget of an IAE run over an interpersonal abilities data file.
+
+    Returns:
+        Tuple of (budget per bound, stats with 'prompts' and 'max_prompt_tokens')
+    """
+    total = Budget()
+    stats = {'prompts': 0, 'max_prompt_tokens': 0}
+    for entry in iter_entries(data_path, lang, data_ids, shard, num_shards):
+        try:
+            item = build_item(entry, lang, prompt_layout)
+        except Exception as e:
+            logger.error("Error processing entry %s: %s", entry.get('data_id', 'unknown'), e)
+            continue
+        if item is None:
+            continue
+        tokens = count_tokens(prompt_text(item["prompt"]))
+        total = total + Budget(1, tokens, num_samples * completion_tokens)
+        stats['prompts'] += 1
+        stats['max_prompt_tokens'] = max(stats['max_prompt_tokens'], tokens)
+    # Every item is asked exactly once
+    return {bound: total for bound in BOUNDS}, stats
+
+
+def format_estimate(budgets: Dict[str, Budget], concurrency: int, latency: float, rpm: Optional[float] = None,
+                    tpm: Optional[float] = None, price_prompt: Optional[float] = None,
+                    price_completion: Optional[float] = None) -> str:
+    """Format budgets as a table with one column per bound."""
+    rows = [
+        ("Requests", [f"{budgets[b].requests:,.0f}" for b in BOUNDS]),
+        ("Prompt tokens", [f"{budgets[b].prompt_tokens:,.0f}" for b in BOUNDS]),
+        ("Completion tokens", [f"{budgets[b].completion_tokens:,.0f}" for b in BOUNDS]),
+        ("Duration", [format_duration(budgets[b].duration(concurrency, latency, rpm, tpm)) for b in BOUNDS]),
+    ]
+    if price_prompt is not None or price_completion is not None:
+        rows.append(("Cost", [f"${budgets[b].cost(price_prompt, price_completion):,.2f}" for b in BOUNDS]))
+    width = max(len(label) for label, _ in rows)
+    lines = [" | ".join([" " * width] + [f"{bound:>14}" for bound in BOUNDS])]
+    lines += [" | ".join([f"{label:<{width}}"] + [f"{cell:>14}" for cell in cells]) for label, cells in rows]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Dry run: compile all prompts and estimate requests, tokens, '
+                                                 'cost and duration without calling a model')
+    parser.add_argument('--gae_data_path', type=str, default=None,
+                        help='Path to worldtree data file (estimates GAE if given)')
+    parser.add_argument('--iae_data_path', type=str, default=None,
+                        help='Path to interpersonal abilities data file (estimates IAE if given)')
+    parser.add_argument('--lang', type=str, default='cn', choices=['cn', 'en'],
+                        help='Language to evaluate (cn for Chinese, en for English)')
+    parser.add_argument('--mode', type=str, default='episodes', choices=EPISODE_MODES,
+                        help='GAE mode, as in run_gae.py (default: episodes)')
+    parser.add_argument('--num_samples', type=int, default=1,
+                        help='Samples per decision/item, as in run_gae.py and run_iae.py (default: 1)')
+    parser.add_argument('--samples_per_node', type=int, default=1,
+                        help='Samples per decision node in enumerate mode (default: 1)')
+    parser.add_argument('--prompt_layout', type=str, default='default', choices=PROMPT_LAYOUTS,
+                        help='Prompt layout, as in run_gae.py and run_iae.py (default: default)')
+    parser.add_argument('--skip_forced', action='store_true',
+                        help='Leave out decisions answered from the tree structure, as in run_gae.py')
+    parser.add_argument('--num_models', type=int, default=1,
+                        help='Number of models evaluated, e.g. in a sweep (default: 1)')
+    parser.add_argument('--data_ids', type=str, default=None,
+                        help='Comma-separated data_ids to estimate (optional, default: all)')
+    parser.add_argument('--shard', type=int, default=0,
+                        help='Index of the shard to estimate (default: 0)')
+    parser.add_argument('--num_shards', type=int, default=1,
+                        help='Split the dataset by data_id into this many shards (default: 1)')
+    parser.add_argument('--tokenizer', type=str, default='tiktoken',
+                        help="tiktoken[:<encoding>], chars, or a Hugging Face tokenizer id or path (default: tiktoken)")
+    parser.add_argument('--completion_tokens', type=int, default=150,
+                        help='Expected completion tokens per sample (default: 150)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Requests in flight, for the duration estimate (default: 1)')
+    parser.add_argument('--latency', type=float, default=3.0,
+                        help='Seconds per request, for the duration estimate (default: 3)')
+    parser.add_argument('--rpm', type=float, default=None,
+                        help='Requests per minute allowed, for the duration estimate (optional)')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Tokens per minute allowed, for the duration estimate (optional)')
+    parser.add_argument('--price_prompt', type=float, default=None,
+                        help='USD per million prompt tokens, for the cost estimate (optional)')
+    parser.add_argument('--price_completion', type=float, default=None,
+                        help='USD per million completion tokens, for the cost estimate (optional)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output file to save the estimates (optional)')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if not args.gae_data_path and not args.iae_data_path:
+        parser.error('at least one of --gae_data_path and --iae_data_path is required')
+
+    apply_logging_arguments(args)
+    data_ids = args.data_ids.split(',') if args.data_ids else None
+    shards = dict(data_ids=data_ids, shard=args.shard, num_shards=args.num_shards)
+    timing = dict(concurrency=args.concurrency, latency=args.latency, rpm=args.rpm, tpm=args.tpm)
+    prices = dict(price_prompt=args.price_prompt, price_completion=args.price_completion)
+
+    try:
+        count_tokens = load_tokenizer(args.tokenizer)
+        sections = {}
+        if args.gae_data_path:
+            budgets, stats = estimate_gae(args.gae_data_path, count_tokens, args.lang, args.mode, args.num_samples,
+                                          args.samples_per_node, args.completion_tokens, args.prompt_layout,
+                                          **shards, skip_forced=args.skip_forced)
+            sections['gae'] = ({b: budget * args.num_models for b, budget in budgets.items()}, stats)
+            print(f"\n=== GAE ({args.mode}) ===")
+            print(f"{stats['trees']} world trees, {stats['prompts']} reachable decision prompts, "
+                  f"largest {stats['max_prompt_tokens']} tokens")
+            print(format_estimate(sections['gae'][0], **timing, **prices))
+        if args.iae_data_path:
+            budgets, stats = estimate_iae(args.iae_data_path, count_tokens, args.lang, args.num_samples,
+                                          args.completion_tokens, args.prompt_layout, **shards)
+            sections['iae'] = ({b: budget * args.num_models for b, budget in budgets.items()}, stats)
+            print("\n=== IAE ===")
+            print(f"{stats['prompts']} items, largest prompt {stats['max_prompt_tokens']} tokens")
+            print(format_estimate(sections['iae'][0], **timing, **prices))
+        if len(sections) > 1:
+            total = {b: sections['gae'][0][b] + sections['iae'][0][b] for b in BOUNDS}
+            print("\n=== Total ===")
+            print(format_estimate(total, **timing, **prices))
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({
+                    task: {
+                        'stats': stats,
+                        **{bound: {**vars(budgets[bound]),
+                                   'cost': budgets[bound].cost(**prices),
+                                   'duration': budgets[bound].duration(**timing)} for bound in BOUNDS},
+                    } for task, (budgets, stats) in sections.items()
+                }, f, indent=2, ensure_ascii=False)
+            logger.info("Estimates saved to %s", args.output)
+
+    except Exception as e:
+        logger.error("Error during dry run: %s", e)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
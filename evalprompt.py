@@ -166,6 +166,32 @@ Ending_Evaluation_Prompt_zhou_en = \
 Note: Please output in JSON format, do not output any other content.
 """
 
+# Same prompt as Ending_Evaluation_Prompt_zhou with the growing dialogue
+# placed before the other characters' information, so consecutive decisions
+# of an episode share the longest possible prompt prefix
+Ending_Evaluation_Prompt_zhou_prefix = \
+"""请你扮演{character_name}，给定{character_name}的信息，其中包含了{character_name}的公开信息、隐私信息和在社交场景中要实现的社交目标，同时，给定在社交中其他角色的信息，请你基于给定{character_name}的角色信息、{character_name}的社交目标和{character_name}和其他角色的对话上下文，从给定的选项中选择一个最有可能达成目标结局的{character_name}的回复选项，并给出解释，输出json格式，输出示例: {{"explaination": 解释,"choice": "A"}}。
+[{character_name}的信息]
+{main_profile}
+
+[对话上下文]
+{dialogue_context}
+
+[其他角色的信息]
+{user_profile}
+
+[选项]
+{choices}
+
+注意：请输出json格式，不要输出其他内容。
+"""
+
+# Appended to a decision prompt when the previous answer could not be parsed
+Format_Reminder_Prompt = \
+"""
+注意：请严格按照json格式输出，不要输出其他内容，输出示例: {{"explaination": "解释", "choice": "A"}}，其中choice必须是{letters}中的一个。
+"""
+
 Response_Prompt = \
 """请你扮演{character_name}，给定{character_name}的信息，其中包含了{character_name}的公开信息、隐私信息和在社交场景中要实现的社交目标，同时，给定在社交中其他角色的信息，请你基于给定{character_name}的角色信息、{character_name}的社交目标和{character_name}和其他角色的对话上下文，采用给定的社交技能之一，做出一个最有可能达成目标结局的且使用给定的社交技能之一的{character_name}的回复，回复长度要尽量与{len}相当, 并给出解释,输出json格式,输出示例: {{"explaination": 解释,"skill": 采用的社交技能, "answer": 回复}}。
 注意：回复以对话形式给出，如：{character_name}: 回复内容
@@ -0,0 +1,191 @@
+"""
+Logging and progress reporting for the evaluation scripts.
+
+All modules log through the "socialeval" logger. Per-entry details
+(entries processed, episode outcomes, predictions) are logged at DEBUG,
+so at the default INFO level the hot loop only pays for a level check,
+while run-level events and warnings stay visible. Logs can be written as
+JSON lines for log collectors (--log_json).
+
+Progress shows completed items, the rate and, when the amount of work is
+known, an ETA. On a terminal it redraws a single status line at most a
+few times per second; otherwise (redirected output, JSON logs) it logs a
+progress record at a fixed interval.
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("socialeval")
+
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR')
+
+# The progress line currently drawn on the terminal, cleared before log output
+_active_progress: Optional["Progress"] = None
+_output_lock = threading.RLock()
+
+# Set by setup_logging: report progress at all, and draw it as a terminal status line
+_progress_options = {"enabled": True, "draw": True}
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as one JSON object per line, including `extra` fields."""
+
+    # Attributes every LogRecord has; anything else was passed through `extra`
+    _STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in self._STANDARD})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StatusAwareHandler(logging.StreamHandler):
+    """Stream handler that clears the terminal progress line before writing a record."""
+
+    def emit(self, record: logging.LogRecord) -> None:
+        with _output_lock:
+            if _active_progress is not None and self.stream is _active_progress.stream:
+                _active_progress.clear()
+            super().emit(record)
+
+
+def setup_logging(level: str = 'INFO', json_logs: bool = False, log_file: Optional[str] = None,
+                  progress: bool = True) -> None:
+    """
+    Configure the "socialeval" logger.
+
+    Args:
+        level: Minimum level to log
+        json_logs: Write JSON lines instead of plain text
+        log_file: Write logs to this file instead of stderr (optional)
+        progress: Show progress (see Progress)
+    """
+    handler = logging.FileHandler(log_file, encoding='utf-8') if log_file else _StatusAwareHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if json_logs else logging.Formatter("%(asctime)s %(levelname)s %(message)s",
+                                                                            "%H:%M:%S"))
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False
+    _progress_options.update(enabled=progress, draw=not json_logs and not log_file)
+
+
+def add_logging_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the logging and progress options shared by the evaluation scripts."""
+    parser.add_argument('--log_level', type=str, default='INFO', choices=LOG_LEVELS,
+                        help='Minimum log level; DEBUG logs every entry and prediction (default: INFO)')
+    parser.add_argument('--log_json', action='store_true',
+                        help='Write logs as JSON lines')
+    parser.add_argument('--log_file', type=str, default=None,
+                        help='Write logs to this file instead of stderr (optional)')
+    parser.add_argument('--no_progress', action='store_true',
+                        help='Do not report progress')
+
+
+def apply_logging_arguments(args: argparse.Namespace) -> None:
+    """Configure logging from the options added by add_logging_arguments."""
+    setup_logging(args.log_level, json_logs=args.log_json, log_file=args.log_file, progress=not args.no_progress)
+
+
+def format_duration(seconds: float) -> str:
+    """Format seconds as H:MM:SS or M:SS."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class Progress:
+    """
+    Progress of a run: completed items, rate and ETA.
+
+    update() is cheap; output is throttled to `redraw` seconds on a
+    terminal and to `interval` seconds when logging.
+    """
+
+    def __init__(self, desc: str, total: Optional[int] = None, unit: str = "items",
+                 redraw: float = 0.2, interval: float = 30.0):
+        """
+        Args:
+            desc: Label shown before the counts
+            total: Number of items expected (None if unknown)
+            unit: Name of the items counted
+            redraw: Minimum seconds between terminal redraws
+            interval: Seconds between progress log records when not drawing on a terminal
+        """
+        global _active_progress
+        self.desc = desc
+        self.total = total
+        self.unit = unit
+        self.done = 0
+        self.stream = sys.stderr
+        self.enabled = _progress_options["enabled"]
+        self.draw = self.enabled and _progress_options["draw"] and self.stream.isatty()
+        self.min_gap = redraw if self.draw else interval
+        self.start = time.monotonic()
+        self._last = self.start
+        self._drawn = False
+        self._reported = 0
+        if self.draw:
+            _active_progress = self
+
+    def status(self) -> str:
+        """Return the current progress as text."""
+        elapsed = time.monotonic() - self.start
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        text = f"{self.desc}: {self.done}" + (f"/{self.total}" if self.total is not None else "")
+        text += f" {self.unit} [{format_duration(elapsed)}, {rate:.2f} {self.unit}/s"
+        if self.total is not None and rate > 0:
+            text += f", ETA {format_duration(max(self.total - self.done, 0) / rate)}"
+        return text + "]"
+
+    def update(self, n: int = 1) -> None:
+        """Count n more completed items."""
+        self.done += n
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        if now - self._last < self.min_gap and self.done != self.total:
+            return
+        self._last = now
+        if self.draw:
+            with _output_lock:
+                self.stream.write("\r\033[K" + self.status())
+                self.stream.flush()
+                self._drawn = True
+        else:
+            self._log()
+
+    def _log(self) -> None:
+        self._reported = self.done
+        logger.info(self.status(), extra={"progress": {"done": self.done, "total": self.total}})
+
+    def clear(self) -> None:
+        """Erase the progress line so other output starts on a clean line."""
+        if self._drawn:
+            self.stream.write("\r\033[K")
+            self._drawn = False
+
+    def close(self) -> None:
+        """Finish the progress output."""
+        global _active_progress
+        if self.enabled and self.draw:
+            with _output_lock:
+                self.stream.write("\r\033[K" + self.status() + "\n")
+                self.stream.flush()
+        elif self.enabled and self.done != self._reported:
+            self._log()
+        if _active_progress is self:
+            _active_progress = None
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Merge Sharded Evaluation Results
+
+Combines the --checkpoint files written by sharded run_gae.py / run_iae.py
+runs (--shard i --num_shards n) and reports the same per-category (GAE) or
+per-skill (IAE) metrics a single run over the whole dataset would produce.
+
+Usage:
+    python merge_shards.py <shard checkpoint files> [--category <category>] [--ability <ability>] [--output <file>]
+"""
+
+import json
+import argparse
+from typing import Dict, List, Optional, Tuple, Union
+from checkpoint_util import read_meta, read_records
+from log_util import add_logging_arguments, apply_logging_arguments, logger
+from metrics_util import (OVERALL, ResultTable, add_bootstrap_arguments, bootstrap_intervals, format_interval,
+                          normalize_skill)
+
+
+def record_key(task: str, record: Dict) -> Tuple:
+    """Identify a record so that overlapping shard files are not double counted."""
+    if task == 'gae':
+        return record['data_id'], record.get('episode')
+    return (record['data_id'],)
+
+
+def merge_checkpoints(paths: List[str]) -> Tuple[Dict, List[Dict]]:
+    """
+    Load and combine the records of several shard checkpoint files.
+
+    Args:
+        paths: Checkpoint files written by run_gae.py or run_iae.py
+
+    Returns:
+        Tuple of (run configuration shared by the shards, merged records)
+    """
+    meta = None
+    shards = set()
+    num_shards = None
+    records = {}
+
+    for path in paths:
+        shard_meta = read_meta(path)
+        if shard_meta is None:
+            raise ValueError(f"{path} is not a checkpoint file")
+        shard, shard_count = shard_meta.get('shard', [0, 1])
+        config = {key: value for key, value in shard_meta.items() if key != 'shard'}
+        if meta is None:
+            meta, num_shards = config, shard_count
+        elif config != meta or shard_count != num_shards:
+            raise ValueError(f"{path} was written by a different run configuration: {shard_meta}")
+        shards.add(shard)
+
+        for record in read_records(path):
+            records.setdefault(record_key(meta['task'], record), record)
+
+    if meta is None:
+        raise ValueError("No checkpoint files given")
+
+    missing = sorted(set(range(num_shards)) - shards)
+    if missing:
+        logger.warning("Missing shards %s of %d", missing, num_shards)
+
+    return meta, list(records.values())
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Merge sharded GAE/IAE checkpoint files')
+    parser.add_argument('checkpoints', type=str, nargs='+',
+                        help='Checkpoint files written with --checkpoint by each shard')
+    parser.add_argument('--category', type=str, default=None,
+                        help='Specific world category to report for GAE (optional)')
+    parser.add_argument('--ability', type=str, default=None,
+                        help='Specific interpersonal ability to report for IAE (optional)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output file to save merged results (optional)')
+    add_bootstrap_arguments(parser)
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+    apply_logging_arguments(args)
+
+    try:
+        meta, records = merge_checkpoints(args.checkpoints)
+        logger.info("Merged %d records from %d files", len(records), len(args.checkpoints))
+
+        results: Union[Dict, float]
+        if meta['task'] == 'gae':
+            from run_gae import pool_episodes, summarize_goal_achievement
+            if meta.get('mode') == 'adaptive':
+                # Trees played different numbers of episodes; weigh them equally
+                records = pool_episodes(records)
+            results = summarize_goal_achievement(records, args.category)
+            intervals = bootstrap_intervals(ResultTable.from_gae, records, args.bootstrap, args.confidence) or {}
+            print("\n=== Goal Achievement Results ===")
+            for category, success_rate in sorted(results.items()):
+                print(f"{category}: {success_rate:.2f}%{format_interval(intervals.get(category))}")
+            if len(results) > 1:
+                print(f"\nOverall Average: {sum(results.values()) / len(results):.2f}%"
+                      f"{format_interval(intervals.get(OVERALL))}")
+            intervals = {name: interval for name, interval in intervals.items()
+                         if name in results or (name == OVERALL and len(results) > 1)}
+            output = {'category_filter': args.category}
+        else:
+            from run_iae import CATEGORIES, summarize_interpersonal_abilities
+            results = summarize_interpersonal_abilities(records, args.ability)
+            intervals = bootstrap_intervals(lambda r: ResultTable.from_iae(r, CATEGORIES), records, args.bootstrap,
+                                            args.confidence) or {}
+            print("\n=== Evaluation Results ===")
+            if isinstance(results, dict):
+                for skill, accuracy in sorted(results.items()):
+                    print(f"{skill}: {accuracy:.2f}%{format_interval(intervals.get(skill))}")
+                avg_accuracy = sum(results.values()) / len(results) if results else 0.0
+                print(f"\nOverall Average: {avg_accuracy:.2f}%{format_interval(intervals.get(OVERALL))}")
+                intervals = {name: interval for name, interval in intervals.items()
+                             if name in results or name == OVERALL}
+            else:
+                key = normalize_skill(args.ability)
+                intervals = {key: intervals[key]} if key in intervals else {}
+                print(f"{args.ability}: {results:.2f}%{format_interval(intervals.get(key))}")
+            output = {'ability_filter': args.ability}
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'model': meta['model'],
+                    'data_path': meta['data_path'],
+                    'language': meta['language'],
+                    **output,
+                    'results': results,
+                    'intervals': intervals,
+                    'confidence': args.confidence if intervals else None,
+                }, f, indent=2, ensure_ascii=False)
+            logger.info("Results saved to %s", args.output)
+
+    except Exception as e:
+        logger.error("Error during merge: %s", e)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,278 @@
+"""
+Columnar result tables and bootstrap confidence intervals.
+
+A ResultTable holds the per-item results of a run as two matrices with one
+row per cluster (data_id: a world tree with all its episodes, or an IAE
+item) and one column per group (world category or skill): the successes
+and the number of trials of the cluster in the group. Every score is a
+ratio of column sums, so the bootstrap draws multinomial weights over the
+clusters for all replicates at once and turns them into replicate scores
+with a single matrix product:
+
+    table = ResultTable.from_iae(records)
+    intervals = table.intervals(resamples=2000, seed=0)
+
+Resampling whole world trees keeps the correlation between the episodes
+of a tree in the intervals. Differences between two models evaluated on
+the same data use the same resamples for both (paired bootstrap), so
+whether two models really differ can be read from a single run.
+
+Intervals need numpy (pip install numpy); without it the scores are still
+reported by the summarize functions, without intervals. numpy is imported
+only once intervals are computed, so the entry points start without it.
+"""
+
+import argparse
+import warnings
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# Aggregate over every group, reported as the overall average
+OVERALL = "Overall Average"
+
+
+def _numpy():
+    """Import numpy on first use, or return None if it is not installed."""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def normalize_skill(name: str) -> str:
+    """Normalize a skill or category name for matching."""
+    return name.replace('-', '').replace(' ', '').lower()
+
+
+class ResultTable:
+    """Successes and trials per (cluster, group), stored as numpy matrices."""
+
+    def __init__(self, clusters: List, groups: List[str], successes, trials,
+                 aggregates: Optional[Dict[str, List[str]]] = None):
+        """
+        Args:
+            clusters: Cluster ids (rows)
+            groups: Group names (columns)
+            successes: Matrix of successes, clusters x groups
+            trials: Matrix of trials, clusters x groups
+            aggregates: Scores averaged over several groups, e.g. skill categories
+                (name -> member groups); members missing from the table are ignored
+        """
+        self.clusters = clusters
+        self.groups = groups
+        self.successes = successes
+        self.trials = trials
+        self.aggregates = {name: [groups.index(g) for g in members if g in groups]
+                           for name, members in (aggregates or {}).items()}
+        self.aggregates = {name: index for name, index in self.aggregates.items() if index}
+
+    @classmethod
+    def from_counts(cls, counts: Dict[Tuple, Tuple[float, float]],
+                    aggregates: Optional[Dict[str, List[str]]] = None) -> "ResultTable":
+        """Build a table from {(cluster, group): (successes, trials)}."""
+        np = _numpy()
+        if np is None:
+            raise ImportError("numpy is required for result tables (pip install numpy)")
+        clusters = list(dict.fromkeys(cluster for cluster, _ in counts))
+        groups = sorted({group for _, group in counts})
+        rows = {cluster: i for i, cluster in enumerate(clusters)}
+        cols = {group: j for j, group in enumerate(groups)}
+        successes = np.zeros((len(clusters), len(groups)))
+        trials = np.zeros((len(clusters), len(groups)))
+        for (cluster, group), (success, count) in counts.items():
+            successes[rows[cluster], cols[group]] += success
+            trials[rows[cluster], cols[group]] += count
+        return cls(clusters, groups, successes, trials, aggregates)
+
+    @classmethod
+    def from_gae(cls, records: List[Dict]) -> "ResultTable":
+        """Build a table of GAE records, grouped by world category and clustered by world tree."""
+        counts = {}
+        for record in records:
+            if 'reach_prob' in record:
+                # Enumerate mode: expected outcome of one episode
+                success, count = record['success_prob'], record['reach_prob']
+            elif record.get('goal_achievement') is None:
+                continue
+            else:
+                success, count = (1 if record['goal_achievement'] == 2 else 0), 1
+            key = (record['data_id'], record['category'])
+            old = counts.get(key, (0.0, 0.0))
+            counts[key] = (old[0] + success, old[1] + count)
+        groups = sorted({group for _, group in counts})
+        return cls.from_counts(counts, {OVERALL: groups})
+
+    @classmethod
+    def from_iae(cls, records: List[Dict], categories: Optional[Dict[str, List[str]]] = None) -> "ResultTable":
+        """
+        Build a table of IAE records, one column per (normalized) skill.
+
+        Args:
+            records: Item records with 'data_id', 'skills' and 'is_correct'
+            categories: Skill categories (e.g. run_iae.CATEGORIES), scored as the mean of their
+                skills under their normalized name
+        """
+        counts = {}
+        for record in records:
+            for skill in record["skills"]:
+                key = (record['data_id'], normalize_skill(skill))
+                old = counts.get(key, (0.0, 0.0))
+                counts[key] = (old[0] + bool(record['is_correct']), old[1] + 1)
+        aggregates = {normalize_skill(category): [normalize_skill(skill) for skill in skills]
+                      for category, skills in (categories or {}).items()}
+        aggregates[OVERALL] = sorted({group for _, group in counts})
+        return cls.from_counts(counts, aggregates)
+
+    def _scores(self, successes, trials):
+        """Group and aggregate scores (%) from column sums; the last axis indexes groups then aggregates."""
+        np = _numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = successes / trials * 100
+        if not self.aggregates:
+            return rates
+        # Groups without trials in a resample are left out of its averages
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            means = [np.nanmean(rates[..., index], axis=-1) for index in self.aggregates.values()]
+        return np.concatenate([rates, np.stack(means, axis=-1)], axis=-1)
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the scores returned by scores(), groups first, then aggregates."""
+        return self.groups + list(self.aggregates)
+
+    def scores(self) -> Dict[str, float]:
+        """Point estimates (%) per group and aggregate, as the summarize functions compute them."""
+        values = self._scores(self.successes.sum(axis=0), self.trials.sum(axis=0))
+        return {name: float(value) for name, value in zip(self.names, values)}
+
+    def replicates(self, weights):
+        """Scores for each row of cluster weights, shape (resamples, scores)."""
+        np = _numpy()
+        with np.errstate(invalid='ignore'):
+            return self._scores(weights @ self.successes, weights @ self.trials)
+
+    def intervals(self, resamples: int = 2000, confidence: float = 0.95,
+                  seed: Optional[int] = 0) -> Dict[str, Tuple[float, float]]:
+        """
+        Percentile bootstrap intervals over clusters.
+
+        Returns:
+            (low, high) in % per group and aggregate; empty if the table has no results
+            (e.g. no episode reached an ending, or no item has skills)
+
+        >>> ResultTable.from_gae([{'data_id': 1, 'category': 'c', 'goal_achievement': None}]).intervals()
+        {}
+        """
+        if not self.clusters or not self.groups:
+            return {}
+        weights = bootstrap_weights(len(self.clusters), resamples, seed)
+        return _percentiles(self.names, self.replicates(weights), confidence)
+
+    def align(self, clusters: Sequence, groups: Sequence[str]) -> "ResultTable":
+        """Return the table restricted and reordered to the given clusters and groups (missing ones are empty)."""
+        np = _numpy()
+        rows = {cluster: i for i, cluster in enumerate(self.clusters)}
+        cols = {group: j for j, group in enumerate(self.groups)}
+        successes = np.zeros((len(clusters), len(groups)))
+        trials = np.zeros((len(clusters), len(groups)))
+        r = [(i, rows[c]) for i, c in enumerate(clusters) if c in rows]
+        g = [(j, cols[name]) for j, name in enumerate(groups) if name in cols]
+        if r and g:
+            (ri, rs), (gj, gs) = zip(*r), zip(*g)
+            successes[np.ix_(ri, gj)] = self.successes[np.ix_(rs, gs)]
+            trials[np.ix_(ri, gj)] = self.trials[np.ix_(rs, gs)]
+        aggregates = {name: [self.groups[j] for j in index] for name, index in self.aggregates.items()}
+        return ResultTable(list(clusters), list(groups), successes, trials, aggregates)
+
+
+def bootstrap_weights(clusters: int, resamples: int, seed: Optional[int] = 0):
+    """Multinomial resampling weights: how often each cluster is drawn in each resample."""
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+    draws = rng.integers(0, clusters, size=(resamples, clusters))
+    # Count the draws of every resample in one bincount, offsetting each row into its own range
+    offsets = np.arange(resamples)[:, None] * clusters
+    counts = np.bincount((draws + offsets).ravel(), minlength=resamples * clusters)
+    return counts.reshape(resamples, clusters).astype(float)
+
+
+def _percentiles(names: List[str], replicates, confidence: float) -> Dict[str, Tuple[float, float]]:
+    np = _numpy()
+    alpha = (1 - confidence) / 2 * 100
+    with np.errstate(invalid='ignore'):
+        low, high = np.nanpercentile(replicates, [alpha, 100 - alpha], axis=0)
+    return {name: (float(lo), float(hi)) for name, lo, hi in zip(names, low, high)}
+
+
+def paired_difference(a: ResultTable, b: ResultTable, resamples: int = 2000, confidence: float = 0.95,
+                      seed: Optional[int] = 0) -> Dict[str, Tuple[float, float, float]]:
+    """
+    Difference of scores a - b with a paired bootstrap over the clusters both tables share.
+
+    Returns:
+        (difference, low, high) in percentage points per group and aggregate; the
+        difference is significant at the given confidence if the interval excludes 0
+    """
+    clusters = [cluster for cluster in a.clusters if cluster in set(b.clusters)]
+    groups = [group for group in a.groups if group in set(b.groups)]
+    if not clusters or not groups:
+        return {}
+    a, b = a.align(clusters, groups), b.align(clusters, groups)
+    point = {name: a_score - b_score for (name, a_score), b_score in zip(a.scores().items(), b.scores().values())}
+    weights = bootstrap_weights(len(clusters), resamples, seed)
+    intervals = _percentiles(a.names, a.replicates(weights) - b.replicates(weights), confidence)
+    return {name: (point[name], *intervals[name]) for name in a.names}
+
+
+def compare_models(table_of, records: Dict[str, List[Dict]], resamples: int, confidence: float = 0.95,
+                   seed: Optional[int] = 0) -> Optional[Dict[str, Dict[str, Tuple[float, float, float]]]]:
+    """
+    Paired differences of every model against the first one (see paired_difference).
+
+    Args:
+        table_of: Function building a ResultTable from records, e.g. ResultTable.from_gae
+        records: Records per model, the reference model first
+
+    Returns:
+        {model: {score name: (difference, low, high)}} for every model but the first, or None
+        if resampling is disabled, numpy is missing or there is nothing to compare
+    """
+    models = [model for model, model_records in records.items() if model_records]
+    if resamples <= 0 or len(models) < 2 or _numpy() is None:
+        return None
+    reference = table_of(records[models[0]])
+    differences = {model: paired_difference(table_of(records[model]), reference, resamples, confidence, seed)
+                   for model in models[1:]}
+    return differences if any(differences.values()) else None
+
+
+def bootstrap_intervals(table_of, records: List[Dict], resamples: int, confidence: float = 0.95,
+                        seed: Optional[int] = 0) -> Optional[Dict[str, Tuple[float, float]]]:
+    """
+    Intervals for records via table_of (e.g. ResultTable.from_gae), or None if
+    resampling is disabled, numpy is missing or there are no records.
+
+    >>> bootstrap_intervals(ResultTable.from_iae, [{'data_id': 1, 'skills': [], 'is_correct': True}], 100)
+    {}
+    """
+    if resamples <= 0 or not records or _numpy() is None:
+        return None
+    return table_of(records).intervals(resamples, confidence, seed)
+
+
+def format_interval(interval: Optional[Tuple[float, float]]) -> str:
+    """Format an interval as ' [low, high]', or '' if there is none."""
+    if interval is None:
+        return ""
+    return f" [{interval[0]:.2f}, {interval[1]:.2f}]"
+
+
+def add_bootstrap_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the confidence interval options shared by the evaluation scripts."""
+    parser.add_argument('--bootstrap', type=int, default=2000,
+                        help='Bootstrap resamples for confidence intervals; 0 disables them (default: 2000, '
+                             'needs numpy)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='Confidence level of the intervals (default: 0.95)')
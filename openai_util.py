@@ -1,19 +1,527 @@
-from openai import OpenAI
+import os
+import sys
+import random
+import threading
+import time
+import argparse
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
 
-# Initialize the client
-client = OpenAI(
-    api_key="xxx",
-    base_url="xxx"
-)
+from cache_util import CACHE_MODES, ResponseCache, current_scope
+from backend_util import BACKENDS, Backend, create_backend
+from prefix_util import Prompt, PrefixStats, message_content, prompt_text
+from trace_util import Tracer
+from seed_util import current_seed
+from log_util import logger
 
+if TYPE_CHECKING:
+    from openai import OpenAI
 
-def gpt_call(prompt, model="gpt-4o"):
+# Endpoints are read from the environment; several comma-separated base URLs
+# and/or keys spread the load across endpoints.
+DEFAULT_API_KEY = "xxx"
+DEFAULT_BASE_URL = "xxx"
+
+# HTTP status codes worth retrying; anything else (bad request, auth, ...)
+# fails immediately instead of burning through the retries.
+RETRYABLE_STATUS = {408, 409, 429}
+
+# Optional persistent response cache, see configure_cache
+_cache: Optional[ResponseCache] = None
+
+# Backend answering gpt_call; None uses the OpenAI client pool below
+_backend: Optional[Backend] = None
+
+# Answers obtained ahead of time (e.g. from the batch API), consumed by gpt_call
+_prefilled = {}
+_prefilled_lock = threading.Lock()
+
+# Prompt prefix reuse of the requests sent, see prompt_cache_report
+_prefix_stats = PrefixStats()
+
+# Mark prompt segment boundaries as cache breakpoints (cache_control)
+_cache_breakpoints = False
+
+# Per-call latency, retries and token usage, see configure_trace
+_tracer = Tracer()
+_prices = {}
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        """Block until `amount` tokens are available, then take them."""
+        # Requests larger than the bucket would never fit; let them drain it
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def adjust(self, amount: float) -> None:
+        """Give back (positive) or take (negative) tokens after the fact."""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class Endpoint:
+    """One API endpoint/key with its own client, rate limits and cooldown."""
+
+    def __init__(self, base_url: str, api_key: str, rpm: Optional[float], tpm: Optional[float],
+                 max_connections: int):
+        # The SDK is imported with the first endpoint, so that --help, dry runs
+        # and the other backends never load the network stack
+        import httpx
+        from openai import OpenAI
+
+        self.base_url = base_url
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            # Retries are handled by ClientPool.call so backoff spans endpoints
+            max_retries=0,
+            http_client=httpx.Client(limits=httpx.Limits(
+                max_connections=max_connections, max_keepalive_connections=max_connections)),
+        )
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+
+
+class ClientPool:
+    """
+    Pool of API endpoints with rate limiting and retries.
+
+    Each call goes to the endpoint with the fewest requests in flight that is
+    not cooling down after a rate-limit response. Requests wait for their
+    endpoint's requests-per-minute and tokens-per-minute buckets, and failed
+    calls are retried with exponential backoff and full jitter, honoring the
+    server's Retry-After header when present.
+    """
+
+    def __init__(self, endpoints: List[Tuple[str, str]], rpm: Optional[float] = None,
+                 tpm: Optional[float] = None, max_retries: int = 10, max_connections: int = 64,
+                 backoff_base: float = 1.0, backoff_max: float = 60.0):
+        """
+        Args:
+            endpoints: List of (base_url, api_key) pairs
+            rpm: Requests per minute allowed per endpoint (None for no limit)
+            tpm: Tokens per minute allowed per endpoint (None for no limit)
+            max_retries: Number of retries after the first attempt
+            max_connections: HTTP connection pool size per endpoint
+            backoff_base: Initial backoff in seconds
+            backoff_max: Maximum backoff in seconds
+        """
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints = [Endpoint(url, key, rpm, tpm, max_connections) for url, key in endpoints]
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+
+    def _pick(self) -> Endpoint:
+        """Reserve the least loaded endpoint that is not cooling down."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                ready = [e for e in self.endpoints if e.cooldown_until <= now]
+                if ready:
+                    endpoint = min(ready, key=lambda e: e.in_flight)
+                    endpoint.in_flight += 1
+                    return endpoint
+                wait = min(e.cooldown_until for e in self.endpoints) - now
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait before the next attempt."""
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def call(self, request: Callable[["OpenAI"], object], estimated_tokens: int = 0,
+             usage_tokens: Optional[Callable[[object], Optional[int]]] = None,
+             errors: Optional[List[str]] = None) -> object:
+        """
+        Run request(client) on a pooled endpoint, retrying transient failures.
+
+        Args:
+            request: Function issuing the API request with the given client
+            estimated_tokens: Tokens to reserve from the tokens-per-minute bucket
+            usage_tokens: Function returning the actual tokens used by a response
+            errors: List collecting the error class name of every failed attempt
+
+        Returns:
+            The response returned by request
+        """
+        for attempt in range(self.max_retries + 1):
+            endpoint = self._pick()
+            try:
+                if endpoint.requests is not None:
+                    endpoint.requests.acquire()
+                if endpoint.tokens is not None:
+                    endpoint.tokens.acquire(estimated_tokens)
+                response = request(endpoint.client)
+            except Exception as e:
+                if errors is not None:
+                    errors.append(type(e).__name__)
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning("GPT API error (%s, attempt %d): %s; backing off %.1fs", endpoint.base_url, attempt + 1,
+                               e, delay)
+                if getattr(e, "status_code", None) == 429:
+                    # Keep requests off this endpoint while it recovers; the retry
+                    # goes to another endpoint or waits in _pick for the cooldown
+                    with self._lock:
+                        endpoint.cooldown_until = max(endpoint.cooldown_until, time.monotonic() + delay)
+                else:
+                    time.sleep(delay)
+                continue
+            finally:
+                with self._lock:
+                    endpoint.in_flight -= 1
+
+            if endpoint.tokens is not None and usage_tokens is not None:
+                used = usage_tokens(response)
+                if used is not None:
+                    endpoint.tokens.adjust(estimated_tokens - used)
+            return response
+
+
+def transient_errors() -> Tuple[type, ...]:
+    """Connection and timeout exception types of the standard library and the loaded HTTP clients."""
+    types = [ConnectionError, TimeoutError]
+    # Only look at the SDKs already imported by an Endpoint, so this does not load them
+    openai = sys.modules.get("openai")
+    if openai is not None:
+        types.append(openai.APIConnectionError)  # Includes APITimeoutError
+    httpx = sys.modules.get("httpx")
+    if httpx is not None:
+        types.append(httpx.TransportError)  # Includes timeouts
+    return tuple(types)
+
+
+def is_retryable(error: Exception) -> bool:
+    """Whether an API error is transient (rate limits, timeouts, server errors, connection errors)."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # Anything else (TypeError, KeyError, ...) is a bug or a bad request: fail at once
+        return isinstance(error, transient_errors())
+    return status in RETRYABLE_STATUS or status >= 500
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read the Retry-After header of an API error, in seconds, if present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def endpoints_from_env() -> List[Tuple[str, str]]:
+    """
+    Read endpoints from OPENAI_BASE_URL and OPENAI_API_KEY.
+
+    Either variable may hold several comma-separated values; a single value
+    is shared by every entry of the other.
+    """
+    urls = [u.strip() for u in os.environ.get("OPENAI_BASE_URL", DEFAULT_BASE_URL).split(",") if u.strip()]
+    keys = [k.strip() for k in os.environ.get("OPENAI_API_KEY", DEFAULT_API_KEY).split(",") if k.strip()]
+    if len(urls) == 1:
+        urls = urls * len(keys)
+    if len(keys) == 1:
+        keys = keys * len(urls)
+    if len(urls) != len(keys):
+        raise ValueError("OPENAI_BASE_URL and OPENAI_API_KEY must list the same number of values")
+    return list(zip(urls, keys))
+
+
+_pool: Optional[ClientPool] = None
+_pool_options = {}
+_pool_lock = threading.Lock()
+
+
+def configure_client(rpm: Optional[float] = None, tpm: Optional[float] = None, max_retries: int = 10,
+                     endpoints: Optional[List[Tuple[str, str]]] = None) -> None:
+    """
+    Configure rate limits and retries for gpt_call.
+
+    Args:
+        rpm: Requests per minute allowed per endpoint (None for no limit)
+        tpm: Tokens per minute allowed per endpoint (None for no limit)
+        max_retries: Number of retries after the first attempt
+        endpoints: List of (base_url, api_key) pairs; read from the environment if None
+    """
+    global _pool
+    with _pool_lock:
+        _pool = None
+        _pool_options.update(rpm=rpm, tpm=tpm, max_retries=max_retries, endpoints=endpoints)
+
+
+def get_pool() -> ClientPool:
+    """Return the shared client pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            options = dict(_pool_options)
+            endpoints = options.pop("endpoints", None) or endpoints_from_env()
+            _pool = ClientPool(endpoints, **options)
+        return _pool
+
+
+def configure_cache(path: Optional[str], mode: str = "sample", max_mb: Optional[float] = None) -> None:
+    """Enable the on-disk response cache for gpt_call (pass path=None to disable it)."""
+    global _cache
+    if _cache is not None:
+        _cache.close()
+    if path is None:
+        _cache = None
+        return
+    max_bytes = int(max_mb * 1024 * 1024) if max_mb else None
+    _cache = ResponseCache(path, mode=mode, max_bytes=max_bytes)
+
+
+def prefill_responses(model: str, answers: List[Tuple[str, str]], temperature: float = 1,
+                      seeds: Optional[List[Optional[int]]] = None) -> None:
+    """
+    Queue answers obtained ahead of time for gpt_call.
+
+    Each (prompt, response) pair answers one later gpt_call with the same
+    model, prompt, temperature and call seed (seeds, aligned with answers;
+    see seed_util); repeated prompts queue several answers.
+    """
+    seeds = seeds or [None] * len(answers)
+    with _prefilled_lock:
+        for (prompt, response), seed in zip(answers, seeds):
+            _prefilled.setdefault((model, prompt, temperature, seed), []).append(response)
+
+
+def _take_prefilled(model: str, prompt: str, temperature: float, seed: Optional[int] = None) -> Optional[str]:
+    key = (model, prompt, temperature, seed)
+    with _prefilled_lock:
+        answers = _prefilled.get(key)
+        if not answers:
+            return None
+        answer = answers.pop(0)
+        if not answers:
+            del _prefilled[key]
+        return answer
+
+
+def configure_backend(backend: Optional[Backend]) -> None:
+    """Route gpt_call to a backend from backend_util (None for the OpenAI API)."""
+    global _backend
+    _backend = backend
+
+
+def configure_prompt_caching(breakpoints: bool) -> None:
+    """Mark prompt segment boundaries with cache_control breakpoints in API requests."""
+    global _cache_breakpoints
+    _cache_breakpoints = breakpoints
+
+
+def prompt_cache_report() -> Optional[str]:
+    """Summarize the prompt prefix reuse of this run, or None if no request was sent."""
+    return _prefix_stats.report()
+
+
+def configure_trace(path: Optional[str] = None, price_prompt: Optional[float] = None,
+                    price_completion: Optional[float] = None, price_cached: Optional[float] = None) -> None:
+    """
+    Record every gpt_call, optionally to a JSONL trace file.
+
+    Args:
+        path: Trace file to append one record per call to (optional)
+        price_prompt: USD per million prompt tokens, for the cost estimate
+        price_completion: USD per million completion tokens
+        price_cached: USD per million cached prompt tokens (default: price_prompt)
+    """
+    global _tracer
+    _tracer.close()
+    _tracer = Tracer(path)
+    _prices.update(price_prompt=price_prompt, price_completion=price_completion, price_cached=price_cached)
+
+
+def run_report() -> Optional[str]:
+    """Summarize the model calls of this run: latency, retries, tokens, cost and prompt cache reuse."""
+    sections = [_tracer.report(**_prices), _prefix_stats.report()]
+    sections = [section for section in sections if section]
+    return "\n".join(sections) if sections else None
+
+
+def add_model_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the backend, rate limit and cache options shared by the evaluation scripts."""
+    parser.add_argument('--backend', type=str, default='openai', choices=BACKENDS,
+                        help='openai: OpenAI-compatible API; local: transformers model on this machine; '
+                             'stub: deterministic offline answers for testing (default: openai)')
+    parser.add_argument('--local_model_path', type=str, default=None,
+                        help='Model id or path for the local backend (default: --model)')
+    parser.add_argument('--local_batch_size', type=int, default=8,
+                        help='Maximum prompts per forward pass for the local backend (default: 8)')
+    parser.add_argument('--local_device', type=str, default='cpu',
+                        help='Torch device for the local backend (default: cpu)')
+    parser.add_argument('--rpm', type=float, default=None,
+                        help='Requests per minute allowed per API endpoint (optional)')
+    parser.add_argument('--tpm', type=float, default=None,
+                        help='Tokens per minute allowed per API endpoint (optional)')
+    parser.add_argument('--max_retries', type=int, default=10,
+                        help='Retries per API call, with exponential backoff (default: 10)')
+    parser.add_argument('--cache_path', type=str, default=None,
+                        help='SQLite file for caching model responses across runs (optional)')
+    parser.add_argument('--cache_mode', type=str, default='sample', choices=CACHE_MODES,
+                        help='sample: repeated prompts get independent cached samples; '
+                             'replay: repeated prompts reuse the first cached answer')
+    parser.add_argument('--cache_max_mb', type=float, default=None,
+                        help='Evict least recently used cache entries above this size in MB (optional)')
+    parser.add_argument('--prompt_cache_control', action='store_true',
+                        help='Mark prompt segment boundaries as cache_control breakpoints, for APIs '
+                             'that only cache prompt prefixes at explicit breakpoints')
+    parser.add_argument('--trace', type=str, default=None,
+                        help='JSONL file recording the latency, retries and tokens of every model call (optional)')
+    parser.add_argument('--price_prompt', type=float, default=None,
+                        help='USD per million prompt tokens, for the cost estimate in the run report (optional)')
+    parser.add_argument('--price_completion', type=float, default=None,
+                        help='USD per million completion tokens, for the cost estimate (optional)')
+    parser.add_argument('--price_cached', type=float, default=None,
+                        help='USD per million cached prompt tokens (default: --price_prompt)')
+
+
+def apply_model_arguments(args: argparse.Namespace) -> None:
+    """Configure gpt_call from the options added by add_model_arguments."""
+    configure_client(rpm=args.rpm, tpm=args.tpm, max_retries=args.max_retries)
+    configure_prompt_caching(args.prompt_cache_control)
+    configure_trace(args.trace, price_prompt=args.price_prompt, price_completion=args.price_completion,
+                    price_cached=args.price_cached)
+    configure_backend(create_backend(args.backend, model_path=args.local_model_path or args.model,
+                                     batch_size=args.local_batch_size, device=args.local_device))
+    if args.backend != 'openai':
+        logger.info("Backend: %s", args.backend)
+    if args.cache_path:
+        configure_cache(args.cache_path, mode=args.cache_mode, max_mb=args.cache_max_mb)
+        logger.info("Response cache: %s (%s)", args.cache_path, args.cache_mode)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used to reserve rate-limit budget before a request."""
+    return len(text) // 2 + 1
+
+
+def gpt_call(prompt, model="gpt-4o", temperature=1):
     """Make a call to the GPT API using the new OpenAI client."""
-    response = client.chat.completions.create(
-        model=model,
-        temperature=1,
-        messages=[
-            {"role": "user", "content": prompt}
-        ]
-    )
-    return response.choices[0].message.content
\ No newline at end of file
+    return gpt_call_n(prompt, model=model, n=1, temperature=temperature)[0]
+
+
+def gpt_call_n(prompt: Prompt, model="gpt-4o", n=1, temperature=1):
+    """
+    Sample n completions for one prompt.
+
+    Samples missing from the cache are requested together in a single API
+    call (the `n` parameter), so the prompt tokens are paid for once. The
+    prompt may be a list of segments (see prefix_util), which are sent as
+    separate content parts. A seed attached with seed_util.seeded is sent
+    to the API and keys the cached responses; without one, they are keyed by
+    the item set with cache_util.cache_scope.
+    """
+    text = prompt_text(prompt)
+    seed = current_seed()
+    contents = [None] * n
+    keys = [None] * n
+    if _cache is not None:
+        for i in range(n):
+            keys[i] = _cache.key(model, text, temperature, seed, current_scope())
+            contents[i] = _cache.get(keys[i])
+    cached = {i for i in range(n) if contents[i] is not None}
+
+    # Answers fetched ahead of time (batch API) come first, then the backend
+    for i in range(n):
+        if contents[i] is None:
+            contents[i] = _take_prefilled(model, text, temperature, seed)
+    missing = [i for i in range(n) if contents[i] is None]
+    if missing:
+        _prefix_stats.record_prompt(text)
+        source = "backend" if _backend is not None else "api"
+    else:
+        source = "cache" if len(cached) == n else "prefill"
+
+    start, started = time.time(), time.monotonic()
+    errors: List[str] = []
+    usage = None
+    try:
+        if missing and _backend is not None:
+            fresh = _backend.complete_n(text, model, temperature, len(missing))
+        elif missing:
+            response = get_pool().call(
+                lambda client: client.chat.completions.create(
+                    model=model,
+                    temperature=temperature,
+                    n=len(missing),
+                    **({} if seed is None else {"seed": seed}),
+                    messages=[
+                        {"role": "user", "content": message_content(prompt, _cache_breakpoints)}
+                    ]
+                ),
+                estimated_tokens=estimate_tokens(text),
+                usage_tokens=lambda r: getattr(getattr(r, "usage", None), "total_tokens", None),
+                errors=errors,
+            )
+            usage = getattr(response, "usage", None)
+            fresh = [choice.message.content for choice in response.choices]
+        else:
+            fresh = []
+    except Exception as e:
+        _tracer.record(model, source, len(missing), start, time.monotonic() - started,
+                       errors or [type(e).__name__], ok=False)
+        raise
+
+    cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+    _tracer.record(model, source, len(missing) or n, start, time.monotonic() - started, errors,
+                   getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None),
+                   cached_tokens)
+    if usage is not None:
+        _prefix_stats.record_usage(getattr(usage, "prompt_tokens", None), cached_tokens)
+    for i, content in zip(missing, fresh):
+        contents[i] = content
+
+    if _cache is not None:
+        for i in range(n):
+            if i not in cached and contents[i] is not None:
+                _cache.put(keys[i], model, contents[i])
+    return contents
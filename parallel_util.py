@@ -0,0 +1,113 @@
+"""
+Parallel execution helpers shared by the evaluation scripts.
+
+Evaluation items (GAE episodes, IAE questions) are independent and spend
+nearly all of their time waiting on the model API, so a thread pool is
+enough to keep several requests in flight at once.
+"""
+
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Hashable, Iterable, Iterator, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# End of a queue in keyed_map
+_DONE = object()
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], concurrency: int = 1,
+                ordered: bool = True) -> Iterator[R]:
+    """
+    Apply fn to every item with at most `concurrency` calls running at once.
+
+    Items are pulled from the iterable lazily, so only a small window of
+    work is queued at any time.
+
+    Args:
+        fn: Function to apply to each item
+        items: Items to process
+        concurrency: Maximum number of concurrent calls (1 runs inline)
+        ordered: Yield results in input order if True, otherwise as they complete
+
+    Returns:
+        Iterator over the results of fn
+    """
+    if concurrency <= 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    # Keep a few finished results buffered so one slow call at the head of the
+    # queue does not leave the other workers idle.
+    window = concurrency * 4
+    iterator = iter(items)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        if ordered:
+            pending = deque()
+            for item in iterator:
+                pending.append(executor.submit(fn, item))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            for item in iterator:
+                pending.add(executor.submit(fn, item))
+                if len(pending) >= window:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+def keyed_map(fn: Callable[[T], R], items: Dict[Hashable, Iterable[T]], concurrency: int = 1) -> Iterator[R]:
+    """
+    Apply fn to several queues of items, each with its own concurrency limit.
+
+    Every key (e.g. a model in a sweep) gets its own worker threads, and an
+    item is only submitted once its key has a free worker, so a slow key
+    delays its own items without holding up the others. Results are yielded
+    as they complete.
+
+    Args:
+        fn: Function to apply to each item
+        items: Items to process per key, pulled lazily
+        concurrency: Maximum number of concurrent calls per key
+
+    Returns:
+        Iterator over the results of fn
+    """
+    iterators = {key: iter(queue) for key, queue in items.items()}
+    executors = {key: ThreadPoolExecutor(max_workers=max(concurrency, 1)) for key in iterators}
+    running = {key: 0 for key in iterators}
+    pending = {}
+
+    def refill(key):
+        while key in iterators and running[key] < max(concurrency, 1):
+            item = next(iterators[key], _DONE)
+            if item is _DONE:
+                del iterators[key]
+                return
+            pending[executors[key].submit(fn, item)] = key
+            running[key] += 1
+
+    try:
+        for key in list(iterators):
+            refill(key)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                running[key] -= 1
+                yield future.result()
+                refill(key)
+    finally:
+        for executor in executors.values():
+            executor.shutdown(wait=True)
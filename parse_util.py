@@ -0,0 +1,198 @@
+"""
+Tolerant extraction of the chosen option from model responses.
+
+Both evaluations ask for a JSON object such as
+{"explaination": "...", "choice": "A"}, but models often wrap it in code
+fences, add prose before or after it, use single quotes, truncate it, or
+answer with a bare letter. extract_choice tries, in order: a JSON object
+(fenced or embedded in the text, with Python-literal syntax as a fallback),
+a "choice": X field in otherwise broken JSON, a bare letter, and phrases
+such as "the answer is B". ask_choices re-asks a bounded number of times
+with a format reminder when no valid choice can be extracted.
+"""
+
+import ast
+import json
+import re
+from typing import Callable, Dict, List, Optional
+
+from evalprompt import Format_Reminder_Prompt
+from log_util import logger
+from prefix_util import Prompt
+
+# Models sometimes echo the prompt's output header before answering
+OUTPUT_MARKER = "[My Output]"
+
+FENCE_PATTERN = re.compile(r"```(?:json|JSON)?\s*(.*?)```", re.S)
+CHOICE_KEYS = ("choice", "answer", "选项", "答案")
+# "choice": "B" in JSON that does not parse (truncated, unescaped quotes, ...)
+CHOICE_FIELD_PATTERN = re.compile(r"""["']?(?i:choice|answer)["']?\s*[:：=]\s*["'“]?\s*[(（]?([A-Z])(?![A-Za-z])""")
+# A reply consisting of nothing but the letter, e.g. "B", "(B)", "B."
+BARE_LETTER_PATTERN = re.compile(r"""[\s"'“(（\[]*([A-Za-z])[\s"'”)）\].:：。]*""")
+# Prose answers, e.g. "The answer is B" or "我选择B"
+ANSWER_PATTERN = re.compile(r"(?i:答案|选择|选项|answer|choice|option)\s*(?i:是|为|is|:|：)?\s*[\"'“(（]?([A-Z])(?![A-Za-z])")
+# A field value starting with the letter, e.g. "B", "(B)" or "B. Go home"
+LEADING_LETTER_PATTERN = re.compile(r"""[\s"'“(（\[]*([A-Za-z])(?:[)）\].:：、。"'”]|$)""")
+
+
+def _balanced_end(text: str, start: int) -> int:
+    """Index just past the brace closing the one at start, or -1 if it is never closed."""
+    depth = 0
+    quote = None
+    escaped = False
+    for i in range(start, len(text)):
+        c = text[i]
+        if quote:
+            if escaped:
+                escaped = False
+            elif c == "\\":
+                escaped = True
+            elif c == quote:
+                quote = None
+        elif c in "\"'":
+            quote = c
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return -1
+
+
+def _decode_object(text: str) -> Optional[Dict]:
+    """Decode the first JSON (or Python-literal) object found in text."""
+    text = text.strip()
+    try:
+        result = json.loads(text)
+        if isinstance(result, dict):
+            return result
+    except ValueError:
+        pass
+
+    start = text.find("{")
+    while start != -1:
+        end = _balanced_end(text, start)
+        if end != -1:
+            candidate = text[start:end]
+            for decode in (json.loads, ast.literal_eval):
+                try:
+                    result = decode(candidate)
+                except (ValueError, SyntaxError, TypeError, MemoryError, RecursionError):
+                    continue
+                if isinstance(result, dict):
+                    return result
+        start = text.find("{", start + 1)
+    return None
+
+
+def extract_json(text: Optional[str]) -> Optional[Dict]:
+    """
+    Extract the JSON object from a model response.
+
+    Returns:
+        The decoded object, or None if the response contains none
+    """
+    if not text:
+        return None
+    if OUTPUT_MARKER in text:
+        text = text.split(OUTPUT_MARKER)[-1]
+    # Fenced blocks first, then the whole text
+    for candidate in [m.group(1) for m in FENCE_PATTERN.finditer(text)] + [text]:
+        result = _decode_object(candidate)
+        if result is not None:
+            return result
+    return None
+
+
+def _letter(value) -> Optional[str]:
+    """Read an option letter from a JSON field value such as "B", "(B)" or "B. Go home"."""
+    if not isinstance(value, str):
+        return None
+    match = LEADING_LETTER_PATTERN.match(value.strip())
+    if match:
+        return match.group(1).upper()
+    # Otherwise accept a single stand-alone capital, e.g. "Option B"
+    letters = set(re.findall(r"(?<![A-Za-z])([A-Z])(?![A-Za-z])", value))
+    return letters.pop() if len(letters) == 1 else None
+
+
+def extract_choice(text: Optional[str]) -> Optional[str]:
+    """
+    Extract the chosen option letter from a model response.
+
+    Returns:
+        The upper-case option letter, or None if no choice can be found
+    """
+    if not text:
+        return None
+    result = extract_json(text)
+    if result is not None:
+        for key in CHOICE_KEYS:
+            letter = _letter(result.get(key))
+            if letter is not None:
+                return letter
+        return None
+
+    body = text.split(OUTPUT_MARKER)[-1]
+    match = CHOICE_FIELD_PATTERN.search(body)
+    if match:
+        return match.group(1).upper()
+    match = BARE_LETTER_PATTERN.fullmatch(body.replace("```", ""))
+    if match:
+        return match.group(1).upper()
+    # The last answer phrase is usually the final decision
+    matches = ANSWER_PATTERN.findall(body)
+    if matches:
+        return matches[-1].upper()
+    return None
+
+
+def parse_choice(text: Optional[str], num_choices: int) -> Optional[int]:
+    """
+    Parse the chosen option index from a model response.
+
+    Returns:
+        Index of the chosen option, or None if the response holds no valid choice
+    """
+    letter = extract_choice(text)
+    if letter is None:
+        return None
+    index = ord(letter) - 65
+    return index if 0 <= index < num_choices else None
+
+
+def with_format_reminder(prompt: Prompt, num_choices: int) -> Prompt:
+    """Append a reminder of the expected output format to a prompt, keeping its segments."""
+    letters = ", ".join(chr(65 + i) for i in range(num_choices))
+    reminder = Format_Reminder_Prompt.format(letters=letters)
+    if isinstance(prompt, str):
+        return prompt + reminder
+    return list(prompt) + [reminder]
+
+
+def ask_choices(ask: Callable[[Prompt, int], List[Optional[str]]], prompt: Prompt, num_choices: int,
+                num_samples: int = 1, max_reasks: int = 1) -> List[Optional[int]]:
+    """
+    Sample choices for a prompt, re-asking for samples that cannot be parsed.
+
+    Args:
+        ask: Function returning n responses for a prompt, e.g. gpt_api_samples
+        prompt: The decision prompt
+        num_choices: Number of options in the prompt
+        num_samples: Number of choices to sample
+        max_reasks: Maximum follow-up requests with a format reminder
+
+    Returns:
+        One option index per sample, or None where no valid choice was obtained
+    """
+    choices = [parse_choice(response, num_choices) for response in ask(prompt, num_samples)]
+    for _ in range(max_reasks):
+        missing = [i for i, choice in enumerate(choices) if choice is None]
+        if not missing:
+            break
+        logger.debug("Re-asking for %d unparsable response(s)", len(missing))
+        responses = ask(with_format_reminder(prompt, num_choices), len(missing))
+        for i, response in zip(missing, responses):
+            choices[i] = parse_choice(response, num_choices)
+    return choices
@@ -0,0 +1,124 @@
+"""
+Prompt segments and prefix reuse tracking for server-side prompt caching.
+
+Providers cache the key/value state of prompt prefixes they have recently
+seen, so a request whose leading tokens match an earlier one is cheaper
+and faster. A prompt may therefore be passed to gpt_call as a list of
+segments, ordered from the most stable (instructions, character profile)
+to the most specific (options): the segments are sent as separate content
+parts, optionally marked as cache breakpoints for APIs with explicit
+prompt caching, and joined for the response cache and local backends.
+
+PrefixStats estimates the achievable reuse on the client side, as the
+share of prompt characters that repeat the prefix of a recently sent
+prompt, and collects the cached-token counts reported by the provider.
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Union
+
+# default: the original prompt templates
+# prefix:  stable content first, sent as cacheable segments
+PROMPT_LAYOUTS = ('default', 'prefix')
+
+Prompt = Union[str, List[str]]
+
+
+def prompt_text(prompt: Prompt) -> str:
+    """Return the full text of a prompt given as a string or as segments."""
+    return prompt if isinstance(prompt, str) else "".join(prompt)
+
+
+def message_content(prompt: Prompt, breakpoints: bool = False) -> Union[str, List[Dict]]:
+    """
+    Build the user message content for a prompt.
+
+    Args:
+        prompt: Prompt string or list of segments
+        breakpoints: Mark the end of every segment but the last with
+            cache_control, for APIs that cache only at explicit breakpoints
+
+    Returns:
+        The prompt string, or one text content part per segment
+    """
+    if isinstance(prompt, str):
+        return prompt
+    parts = [{"type": "text", "text": segment} for segment in prompt if segment]
+    if breakpoints:
+        for part in parts[:-1]:
+            part["cache_control"] = {"type": "ephemeral"}
+    return parts
+
+
+def split_template(template: str, *headers: str) -> List[str]:
+    """Split a prompt template into segments starting at each of the given section headers."""
+    segments = []
+    for header in headers:
+        index = template.index(header)
+        segments.append(template[:index])
+        template = template[index:]
+    return segments + [template]
+
+
+def format_segments(segments: List[str], **kwargs) -> List[str]:
+    """Fill in every segment of a split template."""
+    return [segment.format(**kwargs) for segment in segments]
+
+
+def common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix of two strings."""
+    # Binary search on slice equality keeps the comparisons in C
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+class PrefixStats:
+    """Thread-safe counters for prompt prefix reuse across a run."""
+
+    def __init__(self, window: int = 64):
+        """
+        Args:
+            window: Number of recent prompts a new prompt is compared against
+        """
+        self.requests = 0
+        self.chars = 0
+        self.reused_chars = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record_prompt(self, text: str) -> None:
+        """Count a prompt sent to the model and the prefix it shares with recent prompts."""
+        with self._lock:
+            reused = max((common_prefix_length(text, previous) for previous in self._recent), default=0)
+            self.requests += 1
+            self.chars += len(text)
+            self.reused_chars += reused
+            self._recent.append(text)
+
+    def record_usage(self, prompt_tokens: Optional[int], cached_tokens: Optional[int]) -> None:
+        """Count the prompt tokens of a response and how many the provider served from its cache."""
+        if prompt_tokens is None or cached_tokens is None:
+            return
+        with self._lock:
+            self.prompt_tokens += prompt_tokens
+            self.cached_tokens += cached_tokens
+
+    def report(self) -> Optional[str]:
+        """Summarize prefix reuse, or None if no prompt was sent."""
+        if not self.requests:
+            return None
+        lines = [f"Prompt prefix reuse: {self.reused_chars / max(self.chars, 1) * 100:.1f}% of prompt "
+                 f"characters repeat a recent prompt ({self.requests} requests)"]
+        if self.prompt_tokens:
+            lines.append(f"Provider prompt cache: {self.cached_tokens / self.prompt_tokens * 100:.1f}% of "
+                         f"prompt tokens cached ({self.cached_tokens}/{self.prompt_tokens})")
+        return "\n".join(lines)
@@ -11,228 +11,591 @@ Usage:
 
 import os
 import json
-import random
 import argparse
-from typing import Dict, List, Optional, Tuple
-from openai_util import gpt_call
-from evalprompt import Ending_Evaluation_Prompt_zhou
+from collections import Counter
+from typing import Dict, List, Optional, Tuple, Union
+from openai_util import gpt_call, gpt_call_n, add_model_arguments, apply_model_arguments, run_report
+from parallel_util import bounded_map
+from trace_util import tagged
+from parse_util import ask_choices
+from checkpoint_util import Checkpoint
+from cache_util import cache_scope
+from data_util import count_entries, iter_entries
+from log_util import Progress, add_logging_arguments, apply_logging_arguments, logger
+from batch_util import prefill_from_batch
+from seed_util import derive_seed, seeded
+from adaptive_util import AdaptiveSampler
+from metrics_util import OVERALL, ResultTable, add_bootstrap_arguments, bootstrap_intervals, format_interval
+from prefix_util import PROMPT_LAYOUTS, Prompt, format_segments, split_template
+from evalprompt import Ending_Evaluation_Prompt_zhou, Ending_Evaluation_Prompt_zhou_prefix
+from worldtree import EpisodeState, WorldTree
 
 
-def gpt_api(prompt: str, model_name: str = 'gpt-4o') -> str:
-    """API call with retry logic."""
-    for _ in range(10):
-        try:
-            return gpt_call(prompt, model=model_name)
-        except Exception as e:
-            print(f"GPT API error: {e}")
-    raise RuntimeError("Failed to get a response from GPT API after multiple attempts.")
-
-
-def simple_profile(profile: Dict) -> Dict:
-    """Simplify profile format."""
-    return {
-        "name": profile.get("name"),
-        "public": profile.get("public profile"),
-        "private": profile.get("private profile"), 
-        "goal": profile.get("goal"),
-    }
+def gpt_api(prompt: Prompt, model_name: str = 'gpt-4o') -> str:
+    """API call with retry logic (backoff and rate limiting are handled by openai_util)."""
+    try:
+        return gpt_call(prompt, model=model_name)
+    except Exception as e:
+        logger.warning("GPT API error: %s", e)
+        raise RuntimeError("Failed to get a response from GPT API after multiple attempts.") from e
 
 
-def simple_other_profiles(profiles: List[Dict]) -> List[Dict]:
-    """Simplify other character profiles format."""
-    return [{"name": profile["name"], "public": profile.get("public profile", "")} for profile in profiles]
+def gpt_api_samples(prompt: Prompt, model_name: str = 'gpt-4o', n: int = 1) -> List[str]:
+    """Sample n responses to one prompt in a single API call."""
+    if n == 1:
+        return [gpt_api(prompt, model_name=model_name)]
+    try:
+        return gpt_call_n(prompt, model=model_name, n=n)
+    except Exception as e:
+        logger.warning("GPT API error: %s", e)
+        raise RuntimeError("Failed to get a response from GPT API after multiple attempts.") from e
 
 
-def get_interface_state(data: Dict, cids: List[int]) -> Tuple:
+def get_interface_state(data: Union[Dict, WorldTree], cids: List[int]) -> Tuple:
     """
     Extract interface state information from worldtree data.
     
     Args:
-        data: The loaded JSON data
+        data: The loaded JSON data, or a WorldTree built from it
         cids: List of choice IDs representing the path taken
         
     Returns:
         Tuple containing interface state information
     """
-    # Get category from predefined profiles
-    category = str(data["predefined_profiles"][0]["orientation"])
-    main_profile = simple_profile(data["predefined_profiles"][0])
-    other_profiles = simple_other_profiles(data["predefined_profiles"][1:])
-    dialogue = ""
-
-    # Build dialogue from the path
-    for cid in cids:
-        plots = data["interactive_plot"]
-        current_plot = None
-        for plot in plots:
-            if plot["cid"] == cid:
-                current_plot = plot
-                break
-        
-        if current_plot is None:
+    tree = data if isinstance(data, WorldTree) else WorldTree(data)
+    return tree.state(cids)
+
+
+NUM_EPISODES = 10
+
+EPISODE_MODES = ('episodes', 'enumerate', 'adaptive')
+
+# Prefix layout segments: instructions and main profile (fixed per tree), the
+# dialogue (extended at every step), then the other characters and options
+ENDING_PROMPT_SEGMENTS = split_template(Ending_Evaluation_Prompt_zhou_prefix, "[对话上下文]", "[其他角色的信息]")
+
+
+def build_prompt(main: Dict, others: str, dialogue: str, choices: List[str],
+                 prompt_layout: str = 'default') -> Prompt:
+    """
+    Build the decision prompt for the current interface state.
+
+    With prompt_layout 'prefix' the prompt is returned as segments ordered
+    so that consecutive decisions of an episode share a long prefix.
+    """
+    choices_str = '\n'.join([f"{chr(65+i)}: {c}" for i, c in enumerate(choices)])
+    fields = dict(
+        character_name=main['name'],
+        main_profile=json.dumps(main, ensure_ascii=False),
+        user_profile=json.dumps(others, ensure_ascii=False),
+        dialogue_context=dialogue,
+        choices=choices_str
+    )
+    if prompt_layout == 'prefix':
+        return format_segments(ENDING_PROMPT_SEGMENTS, **fields)
+    return Ending_Evaluation_Prompt_zhou.format(**fields)
+
+
+def query_choices(prompt: Prompt, num_choices: int, model_name: str, num_samples: int = 1) -> List[Optional[int]]:
+    """
+    Sample several decisions for one prompt with a single request.
+
+    Responses without a valid choice are re-asked a bounded number of times
+    (see parse_util.ask_choices) instead of ending the episode.
+
+    Returns:
+        One parsed option index (or None for an invalid answer) per sample
+    """
+    try:
+        choices = ask_choices(lambda p, n: gpt_api_samples(p, model_name=model_name, n=n),
+                              prompt, num_choices, num_samples)
+    except Exception as e:
+        logger.warning("Error getting model response: %s", e)
+        return [None] * num_samples
+    if None in choices:
+        logger.debug("No valid choice among %d options in %d response(s)", num_choices, choices.count(None))
+    return choices
+
+
+def query_choice(prompt: Prompt, num_choices: int, model_name: str) -> Optional[int]:
+    """
+    Ask the model for a decision and parse the chosen option.
+
+    Returns:
+        Index of the chosen option, or None if no valid choice was obtained
+    """
+    return query_choices(prompt, num_choices, model_name)[0]
+
+
+def majority_vote(choices: List[Optional[int]]) -> Tuple[Optional[int], Dict[str, int]]:
+    """
+    Pick the most frequent valid choice; ties go to the option sampled first.
+
+    Returns:
+        Tuple of (winning option index or None if no sample was valid, votes per option letter)
+    """
+    counts = Counter(choice for choice in choices if choice is not None)
+    votes = {chr(65 + choice): count for choice, count in sorted(counts.items())}
+    if not counts:
+        return None, votes
+    return counts.most_common(1)[0][0], votes
+
+
+def run_episode(data: Union[Dict, WorldTree], model_name: str, num_samples: int = 1,
+                prompt_layout: str = 'default',
+                skip_forced: bool = False) -> Optional[Tuple[Optional[int], str, List[Dict]]]:
+    """
+    Play one episode of a world tree from the root until an ending is reached.
+
+    With num_samples > 1 every decision is sampled num_samples times in one
+    request and the majority choice is followed (self-consistency).
+
+    Args:
+        data: The language-specific world tree data, or a WorldTree built from it
+        model_name: Model name for evaluation
+        num_samples: Samples per decision for majority voting
+        prompt_layout: 'default' or 'prefix' (see build_prompt)
+        skip_forced: Follow single-choice nodes without asking the model, and end the episode
+            at the first node whose outcome no choice can change (see tree_util.TreeIndex)
+
+    Returns:
+        Tuple of (goal_achievement, category, decisions), where goal_achievement is None
+        if the episode hit a node without choices and decisions lists the cid and vote
+        distribution of every decision taken; None if no usable model answer was obtained
+    """
+    tree = data if isinstance(data, WorldTree) else WorldTree(data)
+    episode = EpisodeState(tree, [0])  # Start from the beginning
+    decisions = []
+
+    while True:
+        # Get current interface state
+        main, main_str, others, dialogue, choices, nexts, goal_achieve, cat = episode.state()
+
+        # Check if we've reached an ending
+        if goal_achieve != -1:
+            return goal_achieve, cat, decisions
+
+        # If no choices available, break
+        if not choices or not nexts:
+            return None, cat, decisions
+
+        if skip_forced:
+            info = tree.index.nodes[episode.path[-1]]
+            if info.determined:
+                return info.outcome, cat, decisions
+            if info.forced:
+                episode.advance(nexts[0])
+                continue
+
+        # Build prompt and get model response
+        prompt = build_prompt(main, others, dialogue, choices, prompt_layout)
+        choice_idx, votes = majority_vote(query_choices(prompt, len(nexts), model_name, num_samples))
+        if choice_idx is None:
+            return None
+        decisions.append({'cid': episode.path[-1], 'votes': votes})
+        episode.advance(nexts[choice_idx])
+
+
+def root_prompt(tree: WorldTree, prompt_layout: str = 'default') -> Optional[Prompt]:
+    """Return the prompt of the first decision of every episode, or None if the root has no choices."""
+    main, main_str, others, dialogue, choices, nexts, goal_achieve, cat = EpisodeState(tree, [0]).state()
+    if goal_achieve != -1 or not choices or not nexts:
+        return None
+    return build_prompt(main, others, dialogue, choices, prompt_layout)
+
+
+def enumerate_tree(data: Union[Dict, WorldTree], model_name: str,
+                   samples_per_node: int = 1, prompt_layout: str = 'default', skip_forced: bool = False) -> Dict:
+    """
+    Compute the expected outcome of an episode by traversing the tree breadth-first.
+
+    Every decision node reachable with non-zero probability is sampled
+    samples_per_node times for its path context, in a single request. The
+    empirical choice distributions are then propagated down the tree, which
+    gives the probability that a random episode reaches an ending and the
+    probability that it achieves the goal, without sampling whole episodes.
+
+    Args:
+        data: The language-specific world tree data, or a WorldTree built from it
+        model_name: Model name for evaluation
+        samples_per_node: Number of model samples per decision node
+        prompt_layout: 'default' or 'prefix' (see build_prompt)
+        skip_forced: Do not query single-choice nodes or nodes whose outcome is determined
+
+    Returns:
+        Dict with 'category', 'reach_prob', 'success_prob', 'queries' (requests sent)
+        and 'decisions' (path and vote distribution of every queried node)
+    """
+    tree = data if isinstance(data, WorldTree) else WorldTree(data)
+    reach_prob = 0.0
+    success_prob = 0.0
+    queries = 0
+    decisions = []
+
+    # Frontier of (path, probability of following it); identical paths are merged
+    frontier = {(0,): 1.0}
+    while frontier:
+        next_frontier = {}
+        for path, prob in frontier.items():
+            main, main_str, others, dialogue, choices, nexts, goal_achieve, cat = tree.state(path)
+
+            # Endings contribute their probability mass directly
+            if goal_achieve != -1:
+                reach_prob += prob
+                if goal_achieve == 2:  # Successful goal achievement
+                    success_prob += prob
+                continue
+
+            # Nodes without choices end the episode without an outcome
+            if not choices or not nexts:
+                continue
+
+            if skip_forced:
+                info = tree.index.nodes[path[-1]]
+                if info.determined:
+                    if info.outcome is not None:
+                        reach_prob += prob
+                        success_prob += prob if info.outcome == 2 else 0.0
+                    continue
+                if info.forced and nexts[0] not in path:
+                    child = path + (nexts[0],)
+                    next_frontier[child] = next_frontier.get(child, 0.0) + prob
+                    continue
+
+            prompt = build_prompt(main, others, dialogue, choices, prompt_layout)
+            counts = [0] * len(nexts)
+            queries += 1
+            for choice_idx in query_choices(prompt, len(nexts), model_name, samples_per_node):
+                # Invalid answers abort the episode, so their mass is dropped
+                if choice_idx is not None:
+                    counts[choice_idx] += 1
+            decisions.append({'path': list(path),
+                              'votes': {chr(65 + i): count for i, count in enumerate(counts) if count}})
+
+            for choice_idx, count in enumerate(counts):
+                # Revisiting a cid would loop forever; treat it as a dead end
+                if count == 0 or nexts[choice_idx] in path:
+                    continue
+                child = path + (nexts[choice_idx],)
+                next_frontier[child] = next_frontier.get(child, 0.0) + prob * count / samples_per_node
+        frontier = next_frontier
+
+    return {
+        'category': tree.category,
+        'reach_prob': reach_prob,
+        'success_prob': success_prob,
+        'queries': queries,
+        'decisions': decisions,
+    }
+
+
+def summarize_goal_achievement(records: List[Dict], world_category: Optional[str] = None) -> Dict:
+    """
+    Compute goal achievement rates from per-episode records.
+
+    Records from enumerate mode carry expected counts ('reach_prob',
+    'success_prob') for a single episode instead of an observed outcome.
+
+    Args:
+        records: Episode records with 'category' and 'goal_achievement' fields
+        world_category (str, optional): Specific world category to filter
+
+    Returns:
+        Dict: Success rate (%) by category
+    """
+    ending_stats = {}
+    for record in records:
+        if 'reach_prob' in record:
+            count, success = record['reach_prob'], record['success_prob']
+        elif record.get('goal_achievement') is None:
+            # Episodes stuck at a node without choices never reached an ending
             continue
-            
-        # Add character profiles that appear in this plot
-        for d in current_plot.get("dialog", []):
-            if "profile" in d:
-                other_profiles.append(simple_profile(d["profile"]))
-            if "content" in d:
-                role = d.get("role", "旁白")
-                dialogue += f"{role}: {d['content']}\n"
-
-    # Get current plot state
-    plots = data["interactive_plot"]
-    current_plot = None
-    for plot in plots:
-        if plot["cid"] == cids[-1]:
-            current_plot = plot
-            break
-    
-    choices = []
-    nexts = []
-    goal_achievement = -1
-    
-    if current_plot:
-        if current_plot["type"] == "ending":
-            goal_achievement = current_plot.get("goal achievement", -1)
         else:
-            for choice in current_plot.get("choices", []):
-                nexts.append(choice["cid"])
-                content = choice.get("content", {})
-                choice_text = f"{content.get('role', '')}: {content.get('content', '')}"
-                choices.append(choice_text)
+            count = 1
+            success = 1 if record['goal_achievement'] == 2 else 0  # Successful goal achievement
+        stats = ending_stats.setdefault(record['category'], {'count': 0, 'success': 0})
+        stats['count'] += count
+        stats['success'] += success
+
+    # Compute success rates
+    ending_acc = {}
+    for category, stats in ending_stats.items():
+        if stats['count'] > 0:
+            ending_acc[category] = stats['success'] / stats['count'] * 100
+        else:
+            ending_acc[category] = 0.0
     
-    return (
-        main_profile,
-        f"主角档案:\n名字: {main_profile['name']}\n公开信息: {main_profile['public']}\n隐私信息: {main_profile['private']}\n社交目标: {main_profile['goal']}",
-        "\n".join([f"{profile['name']}: {profile['public']}" for profile in other_profiles]),
-        dialogue,
-        choices,
-        nexts,
-        goal_achievement,
-        category
-    )
+    # Filter by world category if specified
+    if world_category and world_category in ending_acc:
+        return {world_category: ending_acc[world_category]}
+    
+    return ending_acc
 
 
-def eval_goal_achievement(model_name: str, data_path: str, lang: str = "cn", world_category: Optional[str] = None) -> Dict:
+def pool_episodes(records: List[Dict]) -> List[Dict]:
     """
-    Evaluate goal achievement using the worldtree dataset.
+    Pool the episode records of every tree into one record of expected counts.
+
+    In adaptive mode trees play different numbers of episodes; pooled, every
+    tree counts as one episode (like an enumerate mode record), so it keeps
+    the weight it has when all trees play NUM_EPISODES.
+
+    Returns:
+        One record per tree with 'reach_prob', 'success_prob' and 'episodes'
+    """
+    pooled = {}
+    for record in records:
+        if 'reach_prob' in record:
+            pooled[record['data_id']] = record
+            continue
+        tree = pooled.setdefault(record['data_id'], {'data_id': record['data_id'], 'category': record['category'],
+                                                     'reached': 0, 'success': 0, 'episodes': 0})
+        tree['episodes'] += 1
+        if record.get('goal_achievement') is not None:
+            tree['reached'] += 1
+            tree['success'] += record['goal_achievement'] == 2
+    return [record if 'reach_prob' in record else {
+        'data_id': record['data_id'],
+        'category': record['category'],
+        'reach_prob': record['reached'] / record['episodes'],
+        'success_prob': record['success'] / record['episodes'],
+        'episodes': record['episodes'],
+    } for record in pooled.values()]
+
+
+def collect_goal_achievement(model_name: str, data_path: str, lang: str = "cn",
+                             concurrency: int = 1, checkpoint_path: Optional[str] = None, resume: bool = False,
+                             mode: str = 'episodes', samples_per_node: int = 1, num_samples: int = 1,
+                             data_ids: Optional[List[str]] = None, shard: int = 0, num_shards: int = 1,
+                             batch: bool = False, batch_poll_interval: float = 30.0,
+                             prompt_layout: str = 'default', seed: Optional[int] = None, min_episodes: int = 4,
+                             max_episodes: int = 2 * NUM_EPISODES, tolerance: float = 0.2,
+                             adaptive_confidence: float = 0.95, skip_forced: bool = False) -> List[Dict]:
+    """
+    Play the episodes of the worldtree dataset and collect one record per episode.
     
     Args:
         model_name (str): Model name for evaluation
         data_path (str): Path to the worldtree data file
         lang (str): Language to evaluate ('cn' for Chinese, 'en' for English)
-        world_category (str, optional): Specific world category to filter
+        concurrency (int): Maximum number of episodes evaluated in parallel
+        checkpoint_path (str, optional): JSONL file recording every finished episode
+        resume (bool): Skip episodes already recorded in checkpoint_path
+        mode (str): 'episodes' samples NUM_EPISODES random walks per tree; 'enumerate'
+            traverses every reachable decision node once (see enumerate_tree); 'adaptive'
+            spends NUM_EPISODES per tree on average, stopping trees whose estimate has
+            converged and giving their episodes to the least certain ones (see adaptive_util)
+        samples_per_node (int): Model samples per decision node in enumerate mode
+        num_samples (int): Samples per decision in episodes and adaptive mode; the majority choice is followed
+        data_ids (list, optional): Only evaluate entries with these data_ids
+        shard (int): Index of the shard of the dataset to evaluate
+        num_shards (int): Number of shards the dataset is split into by data_id
+        batch (bool): Send the root decision prompts through the provider batch API first
+        batch_poll_interval (float): Seconds between batch job status checks
+        prompt_layout (str): 'default' uses the original prompt; 'prefix' orders it for
+            provider prompt caching and sends it as segments (see build_prompt)
+        seed (int, optional): Run seed; the model calls of every episode are seeded
+            by (seed, data_id, episode), so reruns reuse cached answers episode by episode
+        min_episodes (int): Episodes every tree plays in adaptive mode
+        max_episodes (int): Episodes a single tree may play at most in adaptive mode
+        tolerance (float): Interval half-width at which a tree stops in adaptive mode
+        adaptive_confidence (float): Confidence level of that interval
+        skip_forced (bool): Answer forced moves and determined outcomes from the tree
+            structure instead of the model (see tree_util)
         
     Returns:
-        Dict: Goal achievement statistics by category
+        List[Dict]: Episode records (one per tree in enumerate and adaptive mode, see
+            pool_episodes), including those resumed
     """
-    ending_stats = {}
-    
     # Validate language parameter
     if lang not in ['cn', 'en']:
         raise ValueError("Language must be 'cn' for Chinese or 'en' for English")
+
+    if mode not in EPISODE_MODES:
+        raise ValueError(f"Mode must be one of {EPISODE_MODES}")
+
+    if prompt_layout not in PROMPT_LAYOUTS:
+        raise ValueError(f"Prompt layout must be one of {PROMPT_LAYOUTS}")
     
     # Load data file
     if not os.path.exists(data_path):
         raise ValueError(f"Data file {data_path} does not exist")
     
-    print(f"Loading data from {data_path} for {lang} language...")
+    logger.info("Loading data from %s for %s language...", data_path, lang)
     
-    try:
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data_list = json.load(f)
-    except Exception as e:
-        raise ValueError(f"Error loading data file: {e}")
-    
-    print(f"Processing {len(data_list)} data entries...")
-    
-    for entry in data_list:
-        try:
+    # Entries are streamed one at a time with only the requested language kept
+    data_list = iter_entries(data_path, lang, data_ids, shard, num_shards)
+
+    checkpoint = None
+    records = []
+    if checkpoint_path:
+        meta = {'task': 'gae', 'model': model_name, 'data_path': data_path, 'language': lang,
+                'shard': [shard, num_shards], 'mode': mode, 'num_samples': num_samples,
+                'prompt_layout': prompt_layout, 'seed': seed}
+        if skip_forced:
+            meta['skip_forced'] = True
+        if mode == 'enumerate':
+            meta['samples_per_node'] = samples_per_node
+        if mode == 'adaptive':
+            meta['adaptive'] = {'min_episodes': min_episodes, 'max_episodes': max_episodes,
+                                'tolerance': tolerance, 'confidence': adaptive_confidence}
+        checkpoint = Checkpoint(checkpoint_path, meta, resume=resume)
+        records = list(checkpoint.records)
+        if records:
+            logger.info("Resuming from %s: %d results already recorded", checkpoint_path, len(records))
+    done = {(record['data_id'], record.get('episode')) for record in records}
+
+    # Enumerate mode handles a whole tree at once, marked as episode None
+    episode_ids = list(range(NUM_EPISODES)) if mode == 'episodes' else [None]
+    # Adaptive mode schedules the episodes of each tree as its results come in
+    sampler = None
+    trees = {}
+    if mode == 'adaptive':
+        sampler = AdaptiveSampler(NUM_EPISODES, min_episodes, max_episodes, tolerance,
+                                  adaptive_confidence)
+        previous = {}
+        for record in records:
+            previous.setdefault(record['data_id'], []).append((record['episode'], record['goal_achievement']))
+
+    def work_items():
+        """Yield one work item per (entry, episode), in dataset order."""
+        for entry in data_list:
             # Extract data based on language
             data_key = f"{lang}_data"
             if data_key not in entry:
-                print(f"Warning: {data_key} not found in entry {entry.get('data_id', 'unknown')}")
+                logger.warning("%s not found in entry %s", data_key, entry.get('data_id', 'unknown'))
                 continue
-                
-            data = entry[data_key]
-            print(f"Processing entry {entry.get('data_id', 'unknown')}")
-            
-            # Run multiple episodes for each scenario
-            for episode in range(10):
-                try:
-                    path = [0]  # Start from the beginning
-                    
-                    while True:
-                        # Get current interface state
-                        main, main_str, others, dialogue, choices, nexts, goal_achieve, cat = get_interface_state(data, path)
-                        
-                        # Check if we've reached an ending
-                        if goal_achieve != -1:
-                            # Record the result
-                            print("goal_achieve", goal_achieve)
-                            stats = ending_stats.setdefault(cat, {'count': 0, 'success': 0})
-                            stats['count'] += 1
-                            if goal_achieve == 2:  # Successful goal achievement
-                                stats['success'] += 1
-                            break
-                        
-                        # If no choices available, break
-                        if not choices or not nexts:
-                            break
-                        
-                        # Build prompt and get model response
-                        choices_str = '\n'.join([f"{chr(65+i)}: {c}" for i, c in enumerate(choices)])
-                        prompt = Ending_Evaluation_Prompt_zhou.format(
-                            character_name=main['name'],
-                            main_profile=json.dumps(main, ensure_ascii=False),
-                            user_profile=json.dumps(others, ensure_ascii=False),
-                            dialogue_context=dialogue,
-                            choices=choices_str
-                        )
-                        
-                        try:
-                            resp = gpt_api(prompt, model_name=model_name)
-                            # Extract choice from response
-                            result = eval(resp.strip().replace("```json", "").replace("```", ""))
-                            ans = result['choice']
-                            choice_idx = ord(ans) - 65
-                            
-                            # Validate choice index
-                            if 0 <= choice_idx < len(nexts):
-                                path.append(nexts[choice_idx])
-                            else:
-                                print(f"Invalid choice {ans} for {len(nexts)} options")
-                                break
-                                
-                        except Exception as e:
-                            print(f"Error getting model response: {e}")
-                            break
-                            
-                except Exception as e:
-                    print(f"Error in episode {episode} for entry {entry.get('data_id', 'unknown')}: {e}")
+
+            if sampler is None:
+                todo = [episode for episode in episode_ids
+                        if (entry.get('data_id', 'unknown'), episode) not in done]
+                if not todo:
                     continue
-                    
+            logger.debug("Processing entry %s", entry.get('data_id', 'unknown'))
+            try:
+                tree = WorldTree(entry[data_key])
+            except Exception as e:
+                logger.error("Error processing entry %s: %s", entry.get('data_id', 'unknown'), e)
+                continue
+            if sampler is not None:
+                # Later rounds need the tree again, so adaptive mode keeps it
+                data_id = entry.get('data_id', 'unknown')
+                trees[data_id] = entry, tree
+                todo = sampler.add(data_id, previous.get(data_id, ()))
+
+            # Run multiple episodes for each scenario, sharing the indexed tree
+            for episode in todo:
+                yield entry, episode, tree
+
+    def play(item):
+        """Run a single episode, reporting failures instead of raising."""
+        entry, episode, tree = item
+        try:
+            data_id = entry.get('data_id', 'unknown')
+            with tagged(tree.category), seeded(derive_seed(seed, data_id, episode)), cache_scope(data_id, episode):
+                if episode is None:
+                    return item, enumerate_tree(tree, model_name, samples_per_node, prompt_layout, skip_forced)
+                return item, run_episode(tree, model_name, num_samples, prompt_layout, skip_forced)
         except Exception as e:
-            print(f"Error processing entry {entry.get('data_id', 'unknown')}: {e}")
-            continue
-    
-    # Compute success rates
-    ending_acc = {}
-    for category, stats in ending_stats.items():
-        if stats['count'] > 0:
-            ending_acc[category] = stats['success'] / stats['count'] * 100
-        else:
-            ending_acc[category] = 0.0
-    
-    # Filter by world category if specified
-    if world_category and world_category in ending_acc:
-        return {world_category: ending_acc[world_category]}
-    
-    return ending_acc
+            logger.error("Error in episode %s for entry %s: %s", episode, entry.get('data_id', 'unknown'), e)
+            return item, None
 
+    work = work_items()
+    total = count_entries(data_path, data_ids, shard, num_shards)
+    if total is not None:
+        # Adaptive mode stops once the budget is spent, usually earlier
+        per_tree = NUM_EPISODES if sampler is not None else len(episode_ids)
+        total = max(total * per_tree - len(records), 0)
+    if batch:
+        # The root decision of every episode is known up front: answer those
+        # through the provider batch API, the rest of each episode goes direct
+        work = list(work)
+        prompts, seeds = [], []
+        for entry, episode, tree in work:
+            prompt = root_prompt(tree, prompt_layout)
+            if prompt is not None and skip_forced and tree.index.nodes[0].forced:
+                prompt = None
+            if prompt is not None:
+                count = samples_per_node if episode is None else num_samples
+                prompts.extend([prompt] * count)
+                seeds.extend([derive_seed(seed, entry.get('data_id', 'unknown'), episode)] * count)
+        prefill_from_batch(prompts, model_name, poll_interval=batch_poll_interval, seeds=seeds)
+        if sampler is None:
+            total = len(work)
 
-def main():
+    def rounds():
+        """Yield the work in rounds: every first episode, then adaptive mode's further rounds."""
+        yield work
+        while sampler is not None:
+            scheduled = sampler.next_round()
+            if not scheduled:
+                break
+            yield [(trees[data_id][0], episode, trees[data_id][1]) for data_id, episode in scheduled]
+
+    # Episodes are independent, so they can run in parallel; results are
+    # consumed in dataset order to keep the report stable.
+    progress = Progress("GAE", total, unit="trees" if mode == 'enumerate' else "episodes")
+    try:
+        for items in rounds():
+            for (entry, episode, _), outcome in bounded_map(play, items, concurrency):
+                progress.update()
+                if outcome is None:
+                    continue
+                # Record the result
+                if episode is None:
+                    logger.debug("Entry %s: expected success %.3f, ending reached %.3f (%d queries)",
+                                 entry.get('data_id', 'unknown'), outcome['success_prob'], outcome['reach_prob'],
+                                 outcome['queries'])
+                    record = {'data_id': entry.get('data_id', 'unknown'), **outcome}
+                else:
+                    goal_achieve, cat, decisions = outcome
+                    logger.debug("Entry %s episode %d: goal_achieve %s", entry.get('data_id', 'unknown'), episode,
+                                 goal_achieve)
+                    record = {
+                        'data_id': entry.get('data_id', 'unknown'),
+                        'episode': episode,
+                        'category': cat,
+                        'goal_achievement': goal_achieve,
+                    }
+                    if num_samples > 1:
+                        logger.debug("votes %s", [decision['votes'] for decision in decisions])
+                        record['decisions'] = decisions
+                records.append(record)
+                if checkpoint is not None:
+                    checkpoint.write(record)
+                if sampler is not None:
+                    sampler.record(record['data_id'], episode, record['goal_achievement'])
+    finally:
+        progress.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if sampler is not None:
+        logger.info(sampler.summary())
+        return pool_episodes(records)
+    return records
+
+
+def eval_goal_achievement(model_name: str, data_path: str, lang: str = "cn", world_category: Optional[str] = None,
+                          **kwargs) -> Dict:
+    """
+    Evaluate goal achievement using the worldtree dataset.
+
+    Args:
+        model_name (str): Model name for evaluation
+        data_path (str): Path to the worldtree data file
+        lang (str): Language to evaluate ('cn' for Chinese, 'en' for English)
+        world_category (str, optional): Specific world category to filter
+        **kwargs: Options of collect_goal_achievement (concurrency, checkpoint_path, mode, ...)
+
+    Returns:
+        Dict: Goal achievement statistics by category
+    """
+    records = collect_goal_achievement(model_name, data_path, lang, **kwargs)
+    return summarize_goal_achievement(records, world_category)
+
+
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description='Goal Achievement Evaluation (GAE)')
     parser.add_argument('--model', type=str, required=True,
                         help='Model name for evaluation (e.g., gpt-4, deepseek-chat)')
@@ -244,29 +607,102 @@ def main():
                         help='Specific world category to evaluate (optional)')
     parser.add_argument('--output', type=str, default=None,
                         help='Output file to save results (optional)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Maximum number of episodes evaluated in parallel (default: 1)')
+    add_model_arguments(parser)
+    add_logging_arguments(parser)
+    add_bootstrap_arguments(parser)
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='JSONL file recording every finished episode (optional)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip episodes already recorded in --checkpoint')
+    parser.add_argument('--mode', type=str, default='episodes', choices=EPISODE_MODES,
+                        help='episodes: sample 10 random walks per tree; enumerate: query every reachable '
+                             'decision node and compute the expected success rate; adaptive: sample 10 walks '
+                             'per tree on average, stopping trees whose success rate has converged and '
+                             'spending the saved episodes on the least certain trees')
+    parser.add_argument('--min_episodes', type=int, default=4,
+                        help='Episodes every tree plays in adaptive mode (default: 4)')
+    parser.add_argument('--max_episodes', type=int, default=2 * NUM_EPISODES,
+                        help=f'Episodes a single tree may play at most in adaptive mode (default: {2 * NUM_EPISODES})')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Adaptive mode stops sampling a tree once the --adaptive_confidence interval '
+                             'of its success rate is within this half-width (default: 0.2)')
+    parser.add_argument('--adaptive_confidence', type=float, default=0.95,
+                        help='Confidence level of the adaptive stopping interval, independent of the '
+                             'reported --confidence (default: 0.95)')
+    parser.add_argument('--samples_per_node', type=int, default=1,
+                        help='Model samples per decision node in enumerate mode (default: 1)')
+    parser.add_argument('--num_samples', type=int, default=1,
+                        help='Samples per decision in episodes mode, requested in one call; the '
+                             'majority choice is followed and the votes are recorded (default: 1)')
+    parser.add_argument('--data_ids', type=str, default=None,
+                        help='Comma-separated data_ids to evaluate (optional, default: all)')
+    parser.add_argument('--shard', type=int, default=0,
+                        help='Index of the shard to evaluate (default: 0)')
+    parser.add_argument('--num_shards', type=int, default=1,
+                        help='Split the dataset by data_id into this many shards (default: 1); '
+                             'combine shard checkpoints with merge_shards.py')
+    parser.add_argument('--batch', action='store_true',
+                        help='Submit the first decision of every episode as one provider batch job')
+    parser.add_argument('--batch_poll_interval', type=float, default=30.0,
+                        help='Seconds between batch job status checks (default: 30)')
+    parser.add_argument('--prompt_layout', type=str, default='default', choices=PROMPT_LAYOUTS,
+                        help='prefix: put the dialogue before the other characters and send the prompt as '
+                             'segments, so consecutive decisions share a cacheable prefix (default: default)')
+    parser.add_argument('--skip_forced', action='store_true',
+                        help='Do not ask the model at single-choice nodes, and end episodes once every '
+                             'continuation leads to the same outcome (see tree_util.py)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for API sampling; every episode gets its own seed, so runs are '
+                             'reproducible under any concurrency or sharding (optional)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
+    if args.batch and args.backend != 'openai':
+        parser.error('--batch requires --backend openai')
     
-    print(f"Running Goal Achievement Evaluation...")
-    print(f"Model: {args.model}")
-    print(f"Data path: {args.data_path}")
-    print(f"Language: {args.lang}")
+    apply_logging_arguments(args)
+    logger.info("Running Goal Achievement Evaluation...")
+    logger.info("Model: %s", args.model)
+    logger.info("Data path: %s", args.data_path)
+    logger.info("Language: %s", args.lang)
     if args.category:
-        print(f"Category filter: {args.category}")
+        logger.info("Category filter: %s", args.category)
     
     try:
-        results = eval_goal_achievement(args.model, args.data_path, args.lang, args.category)
+        apply_model_arguments(args)
+        records = collect_goal_achievement(args.model, args.data_path, args.lang,
+                                           concurrency=args.concurrency, checkpoint_path=args.checkpoint,
+                                           resume=args.resume, mode=args.mode,
+                                           samples_per_node=args.samples_per_node,
+                                           num_samples=args.num_samples,
+                                           data_ids=args.data_ids.split(',') if args.data_ids else None,
+                                           shard=args.shard, num_shards=args.num_shards, batch=args.batch,
+                                           batch_poll_interval=args.batch_poll_interval,
+                                           prompt_layout=args.prompt_layout, seed=args.seed,
+                                           min_episodes=args.min_episodes, max_episodes=args.max_episodes,
+                                           tolerance=args.tolerance, adaptive_confidence=args.adaptive_confidence,
+                                           skip_forced=args.skip_forced)
+        results = summarize_goal_achievement(records, args.category)
+        intervals = bootstrap_intervals(ResultTable.from_gae, records, args.bootstrap, args.confidence,
+                                        args.seed or 0) or {}
         
         print("\n=== Goal Achievement Results ===")
         if isinstance(results, dict):
             for category, success_rate in sorted(results.items()):
-                print(f"{category}: {success_rate:.2f}%")
+                print(f"{category}: {success_rate:.2f}%{format_interval(intervals.get(category))}")
             
             if len(results) > 1:
                 avg_success_rate = sum(results.values()) / len(results)
-                print(f"\nOverall Average: {avg_success_rate:.2f}%")
+                print(f"\nOverall Average: {avg_success_rate:.2f}%{format_interval(intervals.get(OVERALL))}")
         else:
             print(f"Result: {results:.2f}%")
+
+        report = run_report()
+        if report:
+            print(f"\n{report}")
         
         # Save results if output file specified
         if args.output:
@@ -276,12 +712,16 @@ def main():
                     'data_path': args.data_path,
                     'language': args.lang,
                     'category_filter': args.category,
-                    'results': results
+                    'seed': args.seed,
+                    'results': results,
+                    'intervals': {name: interval for name, interval in intervals.items()
+                                  if name in results or (name == OVERALL and len(results) > 1)},
+                    'confidence': args.confidence if intervals else None,
                 }, f, indent=2, ensure_ascii=False)
-            print(f"\nResults saved to {args.output}")
+            logger.info("Results saved to %s", args.output)
             
     except Exception as e:
-        print(f"Error during evaluation: {e}")
+        logger.error("Error during evaluation: %s", e)
         return 1
     
     return 0
@@ -13,19 +13,42 @@ import os
 import json
 import random
 import argparse
+from collections import Counter
 from typing import Dict, List, Optional, Union
-from openai_util import gpt_call
+from openai_util import gpt_call, gpt_call_n, add_model_arguments, apply_model_arguments, run_report
+from parallel_util import bounded_map
+from trace_util import tagged
+from parse_util import ask_choices
+from checkpoint_util import Checkpoint
+from cache_util import cache_scope
+from data_util import count_entries, iter_entries
+from log_util import Progress, add_logging_arguments, apply_logging_arguments, logger
+from batch_util import prefill_from_batch
+from seed_util import derive_seed, item_rng, seeded
+from metrics_util import (OVERALL, ResultTable, add_bootstrap_arguments, bootstrap_intervals, format_interval,
+                          normalize_skill)
+from prefix_util import PROMPT_LAYOUTS, Prompt, format_segments, split_template
 from evalprompt import Skill_Evaluation_Prompt_zhou
 
 
-def gpt_api(prompt: str, model_name: str = 'gpt-4o') -> str:
-    """API call with retry logic."""
-    for _ in range(10):
-        try:
-            return gpt_call(prompt, model=model_name)
-        except Exception as e:
-            print(f"GPT API error: {e}")
-    raise RuntimeError("Failed to get a response from GPT API after multiple attempts.")
+def gpt_api(prompt: Prompt, model_name: str = 'gpt-4o') -> str:
+    """API call with retry logic (backoff and rate limiting are handled by openai_util)."""
+    try:
+        return gpt_call(prompt, model=model_name)
+    except Exception as e:
+        logger.warning("GPT API error: %s", e)
+        raise RuntimeError("Failed to get a response from GPT API after multiple attempts.") from e
+
+
+def gpt_api_samples(prompt: Prompt, model_name: str = 'gpt-4o', n: int = 1) -> List[str]:
+    """Sample n responses to one prompt in a single API call."""
+    if n == 1:
+        return [gpt_api(prompt, model_name=model_name)]
+    try:
+        return gpt_call_n(prompt, model=model_name, n=n)
+    except Exception as e:
+        logger.warning("GPT API error: %s", e)
+        raise RuntimeError("Failed to get a response from GPT API after multiple attempts.") from e
 
 
 def rcpairs2str(rcpair: List[Dict]) -> str:
@@ -33,9 +56,10 @@ def rcpairs2str(rcpair: List[Dict]) -> str:
     return "\n".join([f"{rc.get('role','system')}: {rc['content']}" for rc in rcpair])
 
 
-def choices2str(choices: List[Dict]) -> tuple:
-    """Convert choices to string format and identify correct answer."""
-    random.shuffle(choices)
+def choices2str(choices: List[Dict], rng: random.Random) -> tuple:
+    """Convert choices to string format in an order shuffled by rng and identify correct answer."""
+    choices = list(choices)
+    rng.shuffle(choices)
     # Identify the correct answer letter
     answer = next(chr(65 + i) for i, c in enumerate(choices) if c.get("type") == "skill choice")
     text = "\n".join([f"{chr(65 + i)}. {c['content']['content']}" for i, c in enumerate(choices)])
@@ -87,144 +111,172 @@ CATEGORIES = {
 }
 
 
-def eval_interpersonal_abilities(model_name: str, data_path: str, lang: str = "cn", interactional_ability: Optional[str] = None) -> Union[Dict, float]:
+# Prefix layout segments: everything shared by the questions on one
+# scenario (instructions, profiles, dialogue), then the question and options
+SKILL_PROMPT_SEGMENTS = split_template(Skill_Evaluation_Prompt_zhou, "[提问]")
+
+
+def build_item(entry: Dict, lang: str, prompt_layout: str = 'default', seed: Optional[int] = None) -> Optional[Dict]:
     """
-    Evaluate interpersonal abilities using the SOCIALEVAL_FINAL3 dataset.
-    
+    Build the evaluation prompt for one data entry.
+
     Args:
-        model_name (str): Model name for evaluation (e.g., 'gpt-4', 'deepseek-chat')
-        data_path (str): Path to the interpersonal abilities data file
-        lang (str): Language to evaluate ('cn' for Chinese, 'en' for English)
-        interactional_ability (str, optional): Specific ability to evaluate
-        
+        entry: A data entry from the interpersonal abilities data file
+        lang: Language to evaluate ('cn' or 'en')
+        prompt_layout: 'prefix' returns the prompt as segments, with the scenario
+            shared by several questions as a cacheable first segment
+        seed: Run seed; the option order then depends only on (seed, data_id)
+
     Returns:
-        Dict or float: Accuracy percentages by skill or specific skill accuracy
+        Dict with the prompt, correct answer letter and skills, or None if the entry is unusable
     """
-    # Initialize counters
-    skill_counts = {}  # normalized_skill -> {'correct': int, 'total': int}
-    
-    # Validate language parameter
-    if lang not in ['cn', 'en']:
-        raise ValueError("Language must be 'cn' for Chinese or 'en' for English")
-    
-    # Load data file
-    if not os.path.exists(data_path):
-        raise ValueError(f"Data file {data_path} does not exist")
-    
-    print(f"Loading data from {data_path} for {lang} language...")
-    
+    # Extract data based on language
+    data_key = f"{lang}_data"
+    if data_key not in entry:
+        logger.warning("%s not found in entry %s", data_key, entry.get('data_id', 'unknown'))
+        return None
+
+    data = entry[data_key]
+
+    # Extract question information - new format
+    question_info = data.get("question", {})
+    if not question_info:
+        return None
+
+    # Handle new question format
+    if isinstance(question_info, dict):
+        question = question_info.get("text", "")
+        skills = question_info.get("skills", [])
+    else:
+        # Fallback to old format
+        question = question_info
+        skills = []
+
+    if not question:
+        return None
+
+    # Build prompt components
+    profiles = data.get("profile", [])
+    if not profiles:
+        return None
+
+    self_prof = simple_profile(profiles[0])
+    other_profs = [simple_other_profile(p) for p in profiles[1:]]
+    dialog = rcpairs2str(data.get("content", []))
+
+    # Handle new choices format
+    choices_data = data.get("choices", [])
+    if not choices_data:
+        return None
+
+    # Convert new choices format to old format for compatibility
+    choices_old_format = []
+    for choice in choices_data:
+        if isinstance(choice, dict):
+            choices_old_format.append({
+                "type": choice.get("type", "confusion"),
+                "content": {
+                    "content": choice.get("content", "")
+                }
+            })
+
+    choices_text, correct_letter = choices2str(choices_old_format, item_rng(seed, entry.get('data_id', 'unknown')))
+
+    # Format the prompt
+    fields = dict(
+        character_name=self_prof['name'],
+        public=self_prof['public'] or "",
+        private=self_prof['private'] or "",
+        goal=self_prof['goal'] or "",
+        user_profile=other_profs,
+        dialogue_context=dialog,
+        question=question,
+        choices=choices_text
+    )
+    if prompt_layout == 'prefix':
+        prompt = format_segments(SKILL_PROMPT_SEGMENTS, **fields)
+    else:
+        prompt = Skill_Evaluation_Prompt_zhou.format(**fields)
+
+    return {
+        "data_id": entry.get('data_id', 'unknown'),
+        "seed": derive_seed(seed, entry.get('data_id', 'unknown')),
+        "prompt": prompt,
+        "correct_letter": correct_letter,
+        "num_choices": len(choices_old_format),
+        "skills": skills,
+    }
+
+
+def score_item(item: Dict, model_name: str, num_samples: int = 1) -> Optional[Dict]:
+    """
+    Query the model for one prepared item and check its answer.
+
+    With num_samples > 1 the answers are sampled in one request and the
+    majority answer is scored (self-consistency). Responses without a valid
+    choice are re-asked a bounded number of times (see parse_util.ask_choices).
+
+    Args:
+        item: Item built by build_item
+        model_name: Model name for evaluation
+        num_samples: Samples per item for majority voting
+
+    Returns:
+        Result record for the item, or None if no usable answer was obtained
+    """
+    # Get model prediction
     try:
-        with open(data_path, 'r', encoding='utf-8') as f:
-            data_list = json.load(f)
-    except Exception as e:
-        raise ValueError(f"Error loading data file: {e}")
-    
-    print(f"Processing {len(data_list)} data entries...")
-    
-    for entry in data_list:
-        try:
-            # Extract data based on language
-            data_key = f"{lang}_data"
-            if data_key not in entry:
-                print(f"Warning: {data_key} not found in entry {entry.get('data_id', 'unknown')}")
-                continue
-                
-            print(f"Processing entry {entry.get('data_id', 'unknown')}")
-            
-            data = entry[data_key]
-            
-            # Extract question information - new format
-            question_info = data.get("question", {})
-            if not question_info:
-                continue
-                
-            # Handle new question format
-            if isinstance(question_info, dict):
-                question = question_info.get("text", "")
-                skills = question_info.get("skills", [])
-            else:
-                # Fallback to old format
-                question = question_info
-                skills = []
-            
-            if not question:
-                continue
-                
-            # Build prompt components
-            profiles = data.get("profile", [])
-            if not profiles:
-                continue
-                
-            self_prof = simple_profile(profiles[0])
-            other_profs = [simple_other_profile(p) for p in profiles[1:]]
-            dialog = rcpairs2str(data.get("content", []))
-            
-            # Handle new choices format
-            choices_data = data.get("choices", [])
-            if not choices_data:
-                continue
-                
-            # Convert new choices format to old format for compatibility
-            choices_old_format = []
-            for choice in choices_data:
-                if isinstance(choice, dict):
-                    choices_old_format.append({
-                        "type": choice.get("type", "confusion"),
-                        "content": {
-                            "content": choice.get("content", "")
-                        }
-                    })
-            
-            choices_text, correct_letter = choices2str(choices_old_format)
-            
-            # Format the prompt
-            prompt = Skill_Evaluation_Prompt_zhou.format(
-                character_name=self_prof['name'],
-                public=self_prof['public'] or "",
-                private=self_prof['private'] or "",
-                goal=self_prof['goal'] or "",
-                user_profile=other_profs,
-                dialogue_context=dialog,
-                question=question,
-                choices=choices_text
-            )
-            
-            # Get model prediction
-            try:
-                resp = gpt_api(prompt, model_name=model_name)
-            except RuntimeError:
-                print("Skipping item due to API failure")
-                continue
-            
-            # Extract JSON response
-            if "[My Output]" in resp:
-                resp = resp.split("[My Output]")[-1]
-            if "```json" in resp:
-                resp = resp.split("```json")[-1]
-                
-            try:
-                result = json.loads(resp.strip().replace("```", ""))
-            except json.JSONDecodeError:
-                print("Skipping item due to JSON decode error")
-                continue
-            
-            pred = result.get("choice")
-            is_correct = (pred == correct_letter)
+        with seeded(item["seed"]), cache_scope(item["data_id"]):
+            choices = ask_choices(lambda p, n: gpt_api_samples(p, model_name=model_name, n=n),
+                                  item["prompt"], item["num_choices"], num_samples)
+    except RuntimeError:
+        logger.warning("Skipping item %s due to API failure", item["data_id"])
+        return None
 
-            print(f"pred: {pred}, correct_letter: {correct_letter}, is_correct: {is_correct}")
-            
-            # Update skill counts
-            for sk in skills:
-                norm = sk.replace('-', '').replace(' ', '').lower()
-                if norm not in skill_counts:
-                    skill_counts[norm] = {'correct': 0, 'total': 0}
-                skill_counts[norm]['total'] += 1
-                if is_correct:
-                    skill_counts[norm]['correct'] += 1
-                    
-        except Exception as e:
-            print(f"Error processing entry {entry.get('data_id', 'unknown')}: {e}")
-            continue
+    votes = Counter(chr(65 + choice) for choice in choices if choice is not None)
+    if not votes:
+        logger.warning("Skipping item %s due to unparsable response", item["data_id"])
+        return None
+
+    # Ties go to the answer sampled first
+    pred = votes.most_common(1)[0][0]
+    correct_letter = item["correct_letter"]
+    is_correct = (pred == correct_letter)
+
+    logger.debug("Entry %s: pred %s, correct_letter %s, is_correct %s", item["data_id"], pred, correct_letter,
+                 is_correct)
+    record = {
+        "data_id": item["data_id"],
+        "skills": item["skills"],
+        "pred": pred,
+        "correct_letter": correct_letter,
+        "is_correct": is_correct,
+    }
+    if num_samples > 1:
+        record["votes"] = dict(votes)
+    return record
+
+
+def summarize_interpersonal_abilities(records: List[Dict], interactional_ability: Optional[str] = None) -> Union[Dict, float]:
+    """
+    Compute skill accuracies from per-item records.
+
+    Args:
+        records: Item records with 'skills' and 'is_correct' fields
+        interactional_ability (str, optional): Specific ability or category to report
+
+    Returns:
+        Dict or float: Accuracy percentages by skill or specific skill accuracy
+    """
+    skill_counts = {}  # normalized_skill -> {'correct': int, 'total': int}
+    for record in records:
+        for sk in record["skills"]:
+            norm = normalize_skill(sk)
+            if norm not in skill_counts:
+                skill_counts[norm] = {'correct': 0, 'total': 0}
+            skill_counts[norm]['total'] += 1
+            if record["is_correct"]:
+                skill_counts[norm]['correct'] += 1
     
     # Calculate accuracies
     skill_acc = {sk: (c['correct'] / c['total'] * 100) if c['total'] > 0 else 0.0 
@@ -235,14 +287,14 @@ def eval_interpersonal_abilities(model_name: str, data_path: str, lang: str = "c
         return skill_acc
     
     # Normalize interactional_ability key
-    key = interactional_ability.replace('-', '').replace(' ', '').lower()
+    key = normalize_skill(interactional_ability)
     
     # Map categories
-    cat_map = {cat.replace('-', '').replace(' ', '').lower(): vals for cat, vals in CATEGORIES.items()}
+    cat_map = {normalize_skill(cat): vals for cat, vals in CATEGORIES.items()}
     
     # Category-level evaluation
     if key in cat_map:
-        subs = [s.replace('-', '').replace(' ', '').lower() for s in cat_map[key]]
+        subs = [normalize_skill(s) for s in cat_map[key]]
         vals = [skill_acc[s] for s in subs if s in skill_acc]
         return sum(vals) / len(vals) if vals else 0.0
     
@@ -254,7 +306,136 @@ def eval_interpersonal_abilities(model_name: str, data_path: str, lang: str = "c
     return skill_acc
 
 
-def main():
+def collect_interpersonal_abilities(model_name: str, data_path: str, lang: str = "cn",
+                                    concurrency: int = 1, checkpoint_path: Optional[str] = None,
+                                    resume: bool = False, data_ids: Optional[List[str]] = None,
+                                    shard: int = 0, num_shards: int = 1, batch: bool = False,
+                                    batch_poll_interval: float = 30.0, num_samples: int = 1,
+                                    prompt_layout: str = 'default', seed: Optional[int] = None) -> List[Dict]:
+    """
+    Score the items of the SOCIALEVAL_FINAL3 dataset and collect one record per item.
+    
+    Args:
+        model_name (str): Model name for evaluation (e.g., 'gpt-4', 'deepseek-chat')
+        data_path (str): Path to the interpersonal abilities data file
+        lang (str): Language to evaluate ('cn' for Chinese, 'en' for English)
+        concurrency (int): Maximum number of items scored in parallel
+        checkpoint_path (str, optional): JSONL file recording every scored item
+        resume (bool): Skip items already recorded in checkpoint_path
+        data_ids (list, optional): Only evaluate entries with these data_ids
+        shard (int): Index of the shard of the dataset to evaluate
+        num_shards (int): Number of shards the dataset is split into by data_id
+        batch (bool): Send all prompts through the provider batch API before scoring
+        batch_poll_interval (float): Seconds between batch job status checks
+        num_samples (int): Samples per item; the majority answer is scored
+        prompt_layout (str): 'prefix' sends prompts as segments for provider prompt caching
+        seed (int, optional): Run seed making option orders and API sampling reproducible per item
+        
+    Returns:
+        List[Dict]: Item records, including those resumed
+    """
+    # Validate language parameter
+    if lang not in ['cn', 'en']:
+        raise ValueError("Language must be 'cn' for Chinese or 'en' for English")
+
+    if prompt_layout not in PROMPT_LAYOUTS:
+        raise ValueError(f"Prompt layout must be one of {PROMPT_LAYOUTS}")
+    
+    # Load data file
+    if not os.path.exists(data_path):
+        raise ValueError(f"Data file {data_path} does not exist")
+    
+    logger.info("Loading data from %s for %s language...", data_path, lang)
+    
+    # Entries are streamed one at a time with only the requested language kept
+    data_list = iter_entries(data_path, lang, data_ids, shard, num_shards)
+
+    checkpoint = None
+    records = []
+    if checkpoint_path:
+        meta = {'task': 'iae', 'model': model_name, 'data_path': data_path, 'language': lang,
+                'shard': [shard, num_shards], 'num_samples': num_samples,
+                'prompt_layout': prompt_layout, 'seed': seed}
+        checkpoint = Checkpoint(checkpoint_path, meta, resume=resume)
+        records = list(checkpoint.records)
+        if records:
+            logger.info("Resuming from %s: %d items already done", checkpoint_path, len(records))
+    done = {record['data_id'] for record in records}
+    
+    def items():
+        """Build prompts as the data is streamed, ahead of the workers sending them."""
+        for entry in data_list:
+            if entry.get('data_id', 'unknown') in done:
+                continue
+            try:
+                logger.debug("Processing entry %s", entry.get('data_id', 'unknown'))
+                item = build_item(entry, lang, prompt_layout, seed)
+            except Exception as e:
+                logger.error("Error processing entry %s: %s", entry.get('data_id', 'unknown'), e)
+                continue
+            if item is not None:
+                yield item
+
+    def score(item):
+        """Score a single item, reporting failures instead of raising."""
+        try:
+            with tagged(*[normalize_skill(sk) for sk in item["skills"]]):
+                return score_item(item, model_name, num_samples)
+        except Exception as e:
+            logger.error("Error processing entry %s: %s", item['data_id'], e)
+            return None
+
+    work = items()
+    total = count_entries(data_path, data_ids, shard, num_shards)
+    if total is not None:
+        total = max(total - len(records), 0)
+    if batch:
+        # Answer every prompt through the provider batch API first; scoring
+        # then consumes the batch results instead of direct requests
+        work = list(work)
+        prefill_from_batch([item["prompt"] for item in work for _ in range(num_samples)], model_name,
+                           poll_interval=batch_poll_interval,
+                           seeds=[item["seed"] for item in work for _ in range(num_samples)])
+        total = len(work)
+
+    # Record results as responses arrive
+    progress = Progress("IAE", total)
+    try:
+        for record in bounded_map(score, work, concurrency, ordered=False):
+            progress.update()
+            if record is None:
+                continue
+            records.append(record)
+            if checkpoint is not None:
+                checkpoint.write(record)
+    finally:
+        progress.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    return records
+
+
+def eval_interpersonal_abilities(model_name: str, data_path: str, lang: str = "cn", interactional_ability: Optional[str] = None,
+                                 **kwargs) -> Union[Dict, float]:
+    """
+    Evaluate interpersonal abilities using the SOCIALEVAL_FINAL3 dataset.
+
+    Args:
+        model_name (str): Model name for evaluation (e.g., 'gpt-4', 'deepseek-chat')
+        data_path (str): Path to the interpersonal abilities data file
+        lang (str): Language to evaluate ('cn' for Chinese, 'en' for English)
+        interactional_ability (str, optional): Specific ability to evaluate
+        **kwargs: Options of collect_interpersonal_abilities (concurrency, checkpoint_path, ...)
+
+    Returns:
+        Dict or float: Accuracy percentages by skill or specific skill accuracy
+    """
+    records = collect_interpersonal_abilities(model_name, data_path, lang, **kwargs)
+    return summarize_interpersonal_abilities(records, interactional_ability)
+
+
+def main(argv: Optional[List[str]] = None):
     parser = argparse.ArgumentParser(description='Interpersonal Ability Evaluation (IAE)')
     parser.add_argument('--model', type=str, required=True, 
                         help='Model name for evaluation (e.g., gpt-4, deepseek-chat)')
@@ -266,30 +447,82 @@ def main():
                         help='Specific interpersonal ability to evaluate (optional)')
     parser.add_argument('--output', type=str, default=None,
                         help='Output file to save results (optional)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Maximum number of items scored in parallel (default: 1)')
+    add_model_arguments(parser)
+    add_logging_arguments(parser)
+    add_bootstrap_arguments(parser)
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='JSONL file recording every scored item (optional)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip items already recorded in --checkpoint')
+    parser.add_argument('--data_ids', type=str, default=None,
+                        help='Comma-separated data_ids to evaluate (optional, default: all)')
+    parser.add_argument('--shard', type=int, default=0,
+                        help='Index of the shard to evaluate (default: 0)')
+    parser.add_argument('--num_shards', type=int, default=1,
+                        help='Split the dataset by data_id into this many shards (default: 1); '
+                             'combine shard checkpoints with merge_shards.py')
+    parser.add_argument('--batch', action='store_true',
+                        help='Submit all prompts as one provider batch job instead of direct requests')
+    parser.add_argument('--batch_poll_interval', type=float, default=30.0,
+                        help='Seconds between batch job status checks (default: 30)')
+    parser.add_argument('--prompt_layout', type=str, default='default', choices=PROMPT_LAYOUTS,
+                        help='prefix: send the scenario shared by several questions as a separate, '
+                             'cacheable prompt segment (default: default)')
+    parser.add_argument('--num_samples', type=int, default=1,
+                        help='Samples per item, requested in one call; the majority answer is scored '
+                             'and the votes are recorded (default: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for option shuffling and API sampling; every item gets its own stream, '
+                             'so runs are reproducible under any concurrency or sharding (optional)')
     
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
+    if args.resume and not args.checkpoint:
+        parser.error('--resume requires --checkpoint')
+    if args.batch and args.backend != 'openai':
+        parser.error('--batch requires --backend openai')
     
-    print(f"Running Interpersonal Ability Evaluation...")
-    print(f"Model: {args.model}")
-    print(f"Data path: {args.data_path}")
-    print(f"Language: {args.lang}")
+    apply_logging_arguments(args)
+    logger.info("Running Interpersonal Ability Evaluation...")
+    logger.info("Model: %s", args.model)
+    logger.info("Data path: %s", args.data_path)
+    logger.info("Language: %s", args.lang)
     if args.ability:
-        print(f"Specific ability: {args.ability}")
+        logger.info("Specific ability: %s", args.ability)
     
     try:
-        results = eval_interpersonal_abilities(args.model, args.data_path, args.lang, args.ability)
+        apply_model_arguments(args)
+        records = collect_interpersonal_abilities(args.model, args.data_path, args.lang,
+                                                  concurrency=args.concurrency, checkpoint_path=args.checkpoint,
+                                                  resume=args.resume,
+                                                  data_ids=args.data_ids.split(',') if args.data_ids else None,
+                                                  shard=args.shard, num_shards=args.num_shards, batch=args.batch,
+                                                  batch_poll_interval=args.batch_poll_interval,
+                                                  num_samples=args.num_samples,
+                                                  prompt_layout=args.prompt_layout, seed=args.seed)
+        results = summarize_interpersonal_abilities(records, args.ability)
+        intervals = bootstrap_intervals(lambda r: ResultTable.from_iae(r, CATEGORIES), records, args.bootstrap,
+                                        args.confidence, args.seed or 0) or {}
         
         print("\n=== Evaluation Results ===")
         if isinstance(results, dict):
             for skill, accuracy in sorted(results.items()):
-                print(f"{skill}: {accuracy:.2f}%")
+                print(f"{skill}: {accuracy:.2f}%{format_interval(intervals.get(skill))}")
             avg_accuracy = sum(results.values()) / len(results) if results else 0.0
-            print(f"\nOverall Average: {avg_accuracy:.2f}%")
+            print(f"\nOverall Average: {avg_accuracy:.2f}%{format_interval(intervals.get(OVERALL))}")
+            intervals = {name: interval for name, interval in intervals.items() if name in results or name == OVERALL}
         else:
+            key = normalize_skill(args.ability) if args.ability else None
+            intervals = {key: intervals[key]} if key in intervals else {}
             if args.ability:
-                print(f"{args.ability}: {results:.2f}%")
+                print(f"{args.ability}: {results:.2f}%{format_interval(intervals.get(key))}")
             else:
                 print(f"Result: {results:.2f}%")
+
+        report = run_report()
+        if report:
+            print(f"\n{report}")
         
         # Save results if output file specified
         if args.output:
@@ -299,12 +532,15 @@ def main():
                     'data_path': args.data_path,
                     'language': args.lang,
                     'ability_filter': args.ability,
-                    'results': results
+                    'seed': args.seed,
+                    'results': results,
+                    'intervals': intervals,
+                    'confidence': args.confidence if intervals else None,
                 }, f, indent=2, ensure_ascii=False)
-            print(f"\nResults saved to {args.output}")
+            logger.info("Results saved to %s", args.output)
             
     except Exception as e:
-        print(f"Error during evaluation: {e}")
+        logger.error("Error during evaluation: %s", e)
         return 1
     
     return 0
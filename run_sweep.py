@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Multi-Model Sweep Script
+
+Evaluates several models on GAE and/or IAE in one process. The data is
+loaded and preprocessed once (world trees are indexed, IAE prompts are
+built with one shuffle of the choices shared by every model), and every
+model gets its own workers with a limit on requests in flight, so all
+models progress together and a slow model does not hold up the others.
+
+Usage:
+    python run_sweep.py --models <model_a>,<model_b> --gae_data_path <path> --iae_data_path <path> --lang <language>
+"""
+
+import json
+import argparse
+from typing import Dict, List, Optional
+from openai_util import add_model_arguments, apply_model_arguments, run_report
+from parallel_util import keyed_map
+from trace_util import tagged
+from seed_util import derive_seed, seeded
+from cache_util import cache_scope
+from metrics_util import OVERALL, ResultTable, add_bootstrap_arguments, compare_models
+from prefix_util import PROMPT_LAYOUTS
+from data_util import iter_entries
+from log_util import Progress, add_logging_arguments, apply_logging_arguments, logger
+from worldtree import WorldTree
+from run_gae import NUM_EPISODES, run_episode, summarize_goal_achievement
+from run_iae import CATEGORIES, build_item, normalize_skill, score_item, summarize_interpersonal_abilities
+
+
+def sweep_goal_achievement(models: List[str], data_path: str, lang: str = "cn",
+                           concurrency: int = 1, num_samples: int = 1,
+                           prompt_layout: str = 'default', seed: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Run GAE for several models over one copy of the world trees.
+
+    Args:
+        models: Model names to evaluate
+        data_path: Path to the worldtree data file
+        lang: Language to evaluate ('cn' or 'en')
+        concurrency: Maximum requests in flight per model
+        num_samples: Samples per decision/item for majority voting
+        prompt_layout: 'default' or 'prefix' (see run_gae.build_prompt and run_iae.build_item)
+        seed: Run seed (see seed_util); every model sees the same per-item streams
+
+    Returns:
+        Dict: Episode records per model
+    """
+    trees = []
+    for entry in iter_entries(data_path, lang):
+        data_key = f"{lang}_data"
+        if data_key not in entry:
+            logger.warning("%s not found in entry %s", data_key, entry.get('data_id', 'unknown'))
+            continue
+        try:
+            trees.append((entry.get('data_id', 'unknown'), WorldTree(entry[data_key])))
+        except Exception as e:
+            logger.error("Error processing entry %s: %s", entry.get('data_id', 'unknown'), e)
+    logger.info("GAE: %d world trees x %d episodes x %d models", len(trees), NUM_EPISODES, len(models))
+
+    def work_items(model):
+        """Yield the episodes of one model."""
+        for data_id, tree in trees:
+            for episode in range(NUM_EPISODES):
+                yield model, data_id, episode, tree
+
+    def play(item):
+        """Run one episode on one of the model's workers."""
+        model, data_id, episode, tree = item
+        try:
+            with tagged(tree.category), seeded(derive_seed(seed, data_id, episode)), cache_scope(data_id, episode):
+                return item, run_episode(tree, model, num_samples, prompt_layout)
+        except Exception as e:
+            logger.error("Error in episode %s for entry %s (%s): %s", episode, data_id, model, e)
+            return item, None
+
+    records = {model: [] for model in models}
+    progress = Progress("GAE sweep", len(trees) * NUM_EPISODES * len(models), unit="episodes")
+    try:
+        work = {model: work_items(model) for model in models}
+        for (model, data_id, episode, _), outcome in keyed_map(play, work, concurrency):
+            progress.update()
+            if outcome is None:
+                continue
+            goal_achieve, cat, _ = outcome
+            records[model].append({
+                'data_id': data_id,
+                'episode': episode,
+                'category': cat,
+                'goal_achievement': goal_achieve,
+            })
+    finally:
+        progress.close()
+
+    return records
+
+
+def sweep_interpersonal_abilities(models: List[str], data_path: str, lang: str = "cn",
+                                  concurrency: int = 1, num_samples: int = 1,
+                                  prompt_layout: str = 'default', seed: Optional[int] = None) -> Dict[str, Dict]:
+    """
+    Run IAE for several models with prompts built once and shared.
+
+    Args:
+        models: Model names to evaluate
+        data_path: Path to the interpersonal abilities data file
+        lang: Language to evaluate ('cn' or 'en')
+        concurrency: Maximum requests in flight per model
+        num_samples: Samples per decision/item for majority voting
+        prompt_layout: 'default' or 'prefix' (see run_gae.build_prompt and run_iae.build_item)
+        seed: Run seed (see seed_util); every model sees the same per-item streams
+
+    Returns:
+        Dict: Item records per model
+    """
+    items = []
+    for entry in iter_entries(data_path, lang):
+        try:
+            item = build_item(entry, lang, prompt_layout, seed)
+        except Exception as e:
+            logger.error("Error processing entry %s: %s", entry.get('data_id', 'unknown'), e)
+            continue
+        if item is not None:
+            items.append(item)
+    logger.info("IAE: %d items x %d models", len(items), len(models))
+
+    def score(work):
+        """Score one item for one model on one of the model's workers."""
+        model, item = work
+        try:
+            with tagged(*[normalize_skill(sk) for sk in item["skills"]]):
+                return model, score_item(item, model, num_samples)
+        except Exception as e:
+            logger.error("Error processing entry %s (%s): %s", item['data_id'], model, e)
+            return model, None
+
+    def work_items(model):
+        """Yield the items of one model."""
+        for item in items:
+            yield model, item
+
+    records = {model: [] for model in models}
+    work = {model: work_items(model) for model in models}
+    progress = Progress("IAE sweep", len(items) * len(models))
+    try:
+        for model, record in keyed_map(score, work, concurrency):
+            progress.update()
+            if record is not None:
+                records[model].append(record)
+    finally:
+        progress.close()
+
+    return records
+
+
+def print_table(title: str, results: Dict[str, Dict]) -> None:
+    """Print one row per category/skill and one column per model."""
+    models = list(results)
+    rows = sorted({key for scores in results.values() for key in scores})
+    width = max([len(row) for row in rows] + [len("Overall Average")])
+    print(f"\n=== {title} ===")
+    print(" | ".join([" " * width] + [f"{model:>12}" for model in models]))
+    for row in rows:
+        cells = [f"{results[model][row]:>11.2f}%" if row in results[model] else f"{'-':>12}" for model in models]
+        print(" | ".join([f"{row:<{width}}"] + cells))
+    averages = [sum(scores.values()) / len(scores) if scores else 0.0 for scores in results.values()]
+    print(" | ".join([f"{'Overall Average':<{width}}"] + [f"{avg:>11.2f}%" for avg in averages]))
+
+
+def print_differences(title: str, differences: Dict[str, Dict], reference: str) -> None:
+    """Print the paired differences of every model against the reference, marking significant ones with *."""
+    models = list(differences)
+    rows = sorted({key for scores in differences.values() for key in scores}, key=lambda row: (row == OVERALL, row))
+    width = max(len(row) for row in rows)
+    print(f"\n=== {title}: difference vs {reference} ===")
+    print(" | ".join([" " * width] + [f"{model:>26}" for model in models]))
+    for row in rows:
+        cells = []
+        for model in models:
+            if row not in differences[model]:
+                cells.append(f"{'-':>26}")
+                continue
+            diff, low, high = differences[model][row]
+            mark = "*" if low > 0 or high < 0 else " "
+            cells.append(f"{f'{diff:+.2f} [{low:+.2f}, {high:+.2f}]{mark}':>26}")
+        print(" | ".join([f"{row:<{width}}"] + cells))
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Multi-model GAE/IAE sweep')
+    parser.add_argument('--models', type=str, required=True,
+                        help='Comma-separated model names to evaluate')
+    parser.add_argument('--gae_data_path', type=str, default=None,
+                        help='Path to worldtree data file (runs GAE if given)')
+    parser.add_argument('--iae_data_path', type=str, default=None,
+                        help='Path to interpersonal abilities data file (runs IAE if given)')
+    parser.add_argument('--lang', type=str, default='cn', choices=['cn', 'en'],
+                        help='Language to evaluate (cn for Chinese, en for English)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Maximum requests in flight per model (default: 1)')
+    parser.add_argument('--num_samples', type=int, default=1,
+                        help='Samples per decision/item, requested in one call; the majority answer '
+                             'is used (default: 1)')
+    parser.add_argument('--prompt_layout', type=str, default='default', choices=PROMPT_LAYOUTS,
+                        help='prefix: order and segment prompts for provider prompt caching (default: default)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='Seed for option shuffling and API sampling, per item and episode (optional)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output file to save the combined results (optional)')
+    add_model_arguments(parser)
+    add_logging_arguments(parser)
+    add_bootstrap_arguments(parser)
+
+    args = parser.parse_args(argv)
+    if not args.gae_data_path and not args.iae_data_path:
+        parser.error('at least one of --gae_data_path and --iae_data_path is required')
+
+    models = [model.strip() for model in args.models.split(',') if model.strip()]
+    if args.backend == 'local' and len(models) > 1:
+        parser.error('--backend local loads a single model; sweep local models one at a time')
+    # The local backend loads a single model; the others serve any model name
+    args.model = models[0]
+
+    apply_logging_arguments(args)
+    logger.info("Running sweep over %d models: %s", len(models), ', '.join(models))
+
+    try:
+        apply_model_arguments(args)
+        output: Dict[str, Optional[Dict]] = {'models': models, 'language': args.lang, 'seed': args.seed,
+                                             'gae': None, 'iae': None}
+
+        if args.gae_data_path:
+            records = sweep_goal_achievement(models, args.gae_data_path, args.lang, args.concurrency,
+                                             args.num_samples, args.prompt_layout, args.seed)
+            output['gae'] = {model: summarize_goal_achievement(records[model]) for model in models}
+            print_table("Goal Achievement Results", output['gae'])
+            output['gae_differences'] = compare_models(ResultTable.from_gae, records, args.bootstrap,
+                                                       args.confidence, args.seed or 0)
+            if output['gae_differences']:
+                print_differences("Goal Achievement", output['gae_differences'], models[0])
+        if args.iae_data_path:
+            records = sweep_interpersonal_abilities(models, args.iae_data_path, args.lang, args.concurrency,
+                                                    args.num_samples, args.prompt_layout, args.seed)
+            output['iae'] = {model: summarize_interpersonal_abilities(records[model]) for model in models}
+            print_table("Interpersonal Ability Results", output['iae'])
+            output['iae_differences'] = compare_models(lambda r: ResultTable.from_iae(r, CATEGORIES), records,
+                                                       args.bootstrap, args.confidence, args.seed or 0)
+            if output['iae_differences']:
+                print_differences("Interpersonal Ability", output['iae_differences'], models[0])
+
+        report = run_report()
+        if report:
+            print(f"\n{report}")
+
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(output, f, indent=2, ensure_ascii=False)
+            logger.info("Results saved to %s", args.output)
+
+    except Exception as e:
+        logger.error("Error during sweep: %s", e)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,55 @@
+"""
+Reproducible randomness for evaluation runs.
+
+With a run seed, every item draws from its own random stream derived from
+(seed, data_id, episode) instead of from shared global state, so the
+prompts an item gets (e.g. the order of the IAE options) do not depend on
+how many other items ran before it, on concurrency, or on sharding.
+
+The same derived seed is attached to the item's model calls:
+
+    with seeded(derive_seed(seed, data_id, episode)):
+        run_episode(tree, model_name)
+
+gpt_call passes it to the API as the `seed` parameter and adds it to the
+response cache key, so repeated prompts (e.g. the root decision of every
+GAE episode) map to the same cached answer in every run, whatever order
+the episodes finish in.
+"""
+
+import contextvars
+import hashlib
+import json
+import random
+from contextlib import contextmanager
+from typing import Optional
+
+_seed: contextvars.ContextVar = contextvars.ContextVar("call_seed", default=None)
+
+
+def derive_seed(seed: Optional[int], *keys) -> Optional[int]:
+    """Derive a stable 63-bit seed from a run seed and item keys (data_id, episode, ...); None stays None."""
+    if seed is None:
+        return None
+    base = json.dumps([seed, *keys], ensure_ascii=False)
+    return int.from_bytes(hashlib.sha256(base.encode('utf-8')).digest()[:8], 'big') >> 1
+
+
+def item_rng(seed: Optional[int], *keys) -> random.Random:
+    """Random stream for one item; unseeded (different every run) if seed is None."""
+    return random.Random(derive_seed(seed, *keys))
+
+
+@contextmanager
+def seeded(seed: Optional[int]):
+    """Attach a seed to the model calls made inside the block (None leaves them unseeded)."""
+    token = _seed.set(seed)
+    try:
+        yield
+    finally:
+        _seed.reset(token)
+
+
+def current_seed() -> Optional[int]:
+    """Seed attached to model calls in the current context, or None."""
+    return _seed.get()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+SocialEval Command Line
+
+One entry point for the evaluation scripts. Only the module of the chosen
+command is imported, so light commands (merging shard checkpoints,
+summarizing a trace, dry runs) start without loading the API client, and the
+OpenAI SDK is imported only once a request is actually sent.
+
+Usage:
+    python socialeval.py <command> [options]
+
+Commands:
+    gae     Goal achievement evaluation (run_gae.py)
+    iae     Interpersonal ability evaluation (run_iae.py)
+    sweep   Multi-model GAE/IAE sweep (run_sweep.py)
+    merge   Merge sharded checkpoint files (merge_shards.py)
+    dry-run Compile all prompts and estimate requests, tokens, cost and duration (estimate_util.py)
+    report  Summarize a model call trace written with --trace (trace_util.py)
+    index   Analyze world tree structure: paths, outcomes, malformed nodes (tree_util.py)
+"""
+
+import importlib
+import sys
+from typing import List, Optional
+
+# command -> (module providing main(argv), description)
+COMMANDS = {
+    'gae': ('run_gae', 'Goal achievement evaluation'),
+    'iae': ('run_iae', 'Interpersonal ability evaluation'),
+    'sweep': ('run_sweep', 'Multi-model GAE/IAE sweep'),
+    'merge': ('merge_shards', 'Merge sharded checkpoint files'),
+    'dry-run': ('estimate_util', 'Compile all prompts and estimate requests, tokens, cost and duration'),
+    'report': ('trace_util', 'Summarize a model call trace written with --trace'),
+    'index': ('tree_util', 'Analyze world tree structure: paths, outcomes, malformed nodes'),
+}
+
+
+def usage() -> str:
+    width = max(len(command) for command in COMMANDS)
+    lines = ["usage: socialeval.py <command> [options]", "", "commands:"]
+    lines += [f"  {command:<{width}}  {description}" for command, (_, description) in COMMANDS.items()]
+    lines += ["", "Run 'socialeval.py <command> --help' for the options of a command."]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ('-h', '--help'):
+        print(usage())
+        return 0
+    command, args = argv[0], argv[1:]
+    if command not in COMMANDS:
+        print(f"socialeval.py: unknown command '{command}'\n\n{usage()}", file=sys.stderr)
+        return 2
+
+    # Let the command's argparse usage read "socialeval.py <command>"
+    sys.argv[0] = f"{sys.argv[0]} {command}"
+    module = importlib.import_module(COMMANDS[command][0])
+    return module.main(args)
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,194 @@
+"""
+Per-call instrumentation of model requests.
+
+gpt_call reports every request to a Tracer: where the answer came from
+(api, backend, cache or prefilled batch results), its latency including
+retries and backoff, the error class of every failed attempt and the
+token usage returned by the API. Records can be streamed to a JSONL trace
+file, and report() summarizes the run: latency percentiles, throughput,
+retries, tokens per model and per tag, and the estimated cost.
+
+Tags attribute calls to parts of the evaluation; the evaluators tag every
+GAE episode with its world category and every IAE item with its skills:
+
+    with tagged(tree.category):
+        run_episode(tree, model_name)
+"""
+
+import argparse
+import contextvars
+import json
+import math
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+SOURCES = ('api', 'backend', 'cache', 'prefill')
+
+_tags: contextvars.ContextVar = contextvars.ContextVar("trace_tags", default=())
+
+
+@contextmanager
+def tagged(*tags: str):
+    """Attribute the model calls made inside the block to the given tags."""
+    token = _tags.set(tuple(tags))
+    try:
+        yield
+    finally:
+        _tags.reset(token)
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of already sorted values."""
+    if not values:
+        return 0.0
+    rank = max(1, min(len(values), math.ceil(q * len(values) / 100)))
+    return values[rank - 1]
+
+
+class Tracer:
+    """Thread-safe collector of per-call records with an optional JSONL trace file."""
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Args:
+            path: JSONL file to append one record per call to (None to keep them in memory only)
+        """
+        self._lock = threading.Lock()
+        self._file = open(path, 'a', encoding='utf-8') if path else None
+        # (model, source, start, latency, attempts, errors, prompt, completion, cached, tags, ok)
+        self._records: List[Tuple] = []
+
+    def record(self, model: str, source: str, n: int, start: float, latency: float, errors: List[str],
+               prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None,
+               cached_tokens: Optional[int] = None, ok: bool = True) -> None:
+        """
+        Record one gpt_call.
+
+        Args:
+            model: Model name
+            source: One of SOURCES
+            n: Number of samples requested from the source
+            start: time.time() when the request started
+            latency: Seconds spent on the request, including retries
+            errors: Error class name of every failed attempt
+            prompt_tokens: Prompt tokens reported by the API
+            completion_tokens: Completion tokens reported by the API
+            cached_tokens: Prompt tokens served from the provider's prompt cache
+            ok: False if the call failed after all retries
+        """
+        tags = _tags.get()
+        with self._lock:
+            self._records.append((model, source, start, latency, len(errors) + (1 if ok else 0), tuple(errors),
+                                  prompt_tokens or 0, completion_tokens or 0, cached_tokens or 0, tags, ok))
+            if self._file is not None:
+                self._file.write(json.dumps({
+                    'time': start, 'model': model, 'source': source, 'n': n, 'latency': round(latency, 4),
+                    'attempts': len(errors) + (1 if ok else 0), 'errors': errors,
+                    'prompt_tokens': prompt_tokens, 'completion_tokens': completion_tokens,
+                    'cached_tokens': cached_tokens, 'tags': list(tags), 'ok': ok,
+                }, ensure_ascii=False) + "\n")
+                self._file.flush()
+
+    @classmethod
+    def load(cls, path: str) -> "Tracer":
+        """Read the records of a JSONL trace file written with --trace, e.g. to report on a finished run."""
+        tracer = cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                r = json.loads(line)
+                tracer._records.append((r['model'], r['source'], r['time'], r['latency'], r['attempts'],
+                                        tuple(r['errors']), r['prompt_tokens'] or 0, r['completion_tokens'] or 0,
+                                        r['cached_tokens'] or 0, tuple(r['tags']), r['ok']))
+        return tracer
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def report(self, price_prompt: Optional[float] = None, price_completion: Optional[float] = None,
+               price_cached: Optional[float] = None) -> Optional[str]:
+        """
+        Summarize the recorded calls.
+
+        Args:
+            price_prompt: USD per million prompt tokens
+            price_completion: USD per million completion tokens
+            price_cached: USD per million cached prompt tokens (defaults to price_prompt)
+
+        Returns:
+            The report, or None if no call was recorded
+        """
+        with self._lock:
+            records = list(self._records)
+        if not records:
+            return None
+
+        sources: Dict[str, int] = {}
+        errors: Dict[str, int] = {}
+        by_model: Dict[str, int] = {}
+        by_tag: Dict[str, int] = {}
+        latencies = []
+        failed = 0
+        prompt = completion = cached = 0
+        for model, source, start, latency, attempts, errs, p, c, k, tags, ok in records:
+            sources[source] = sources.get(source, 0) + 1
+            for err in errs:
+                errors[err] = errors.get(err, 0) + 1
+            if source in ('api', 'backend'):
+                latencies.append(latency)
+            failed += not ok
+            prompt, completion, cached = prompt + p, completion + c, cached + k
+            by_model[model] = by_model.get(model, 0) + p + c
+            for tag in tags:
+                by_tag[tag] = by_tag.get(tag, 0) + p + c
+        latencies.sort()
+        wall = max(start + latency for _, _, start, latency, *_ in records) - min(r[2] for r in records)
+
+        lines = [f"Model calls: {len(records)} ("
+                 + ", ".join(f"{source} {count}" for source, count in sorted(sources.items()))
+                 + f"), {failed} failed, {len(records) / max(wall, 1e-9):.2f} calls/s over {wall:.1f}s"]
+        if latencies:
+            lines.append(f"Latency: p50 {percentile(latencies, 50):.2f}s, p95 {percentile(latencies, 95):.2f}s, "
+                         f"p99 {percentile(latencies, 99):.2f}s, max {latencies[-1]:.2f}s")
+        if errors:
+            lines.append(f"Retried errors: {sum(errors.values())} ("
+                         + ", ".join(f"{name} {count}" for name, count in sorted(errors.items())) + ")")
+        if prompt or completion:
+            lines.append(f"Tokens: {prompt} prompt ({cached} cached), {completion} completion, "
+                         f"{(prompt + completion) / max(wall, 1e-9):.0f} tokens/s")
+            if len(by_model) > 1:
+                lines.append("Tokens by model: " + ", ".join(f"{m} {t}" for m, t in sorted(by_model.items())))
+            if by_tag:
+                lines.append("Tokens by category/skill: " + ", ".join(f"{tag} {t}" for tag, t in sorted(by_tag.items())))
+            if price_prompt is not None or price_completion is not None:
+                price_cached = price_prompt if price_cached is None else price_cached
+                cost = ((prompt - cached) * (price_prompt or 0) + cached * (price_cached or 0)
+                        + completion * (price_completion or 0)) / 1e6
+                lines.append(f"Estimated cost: ${cost:.4f}")
+        return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Summarize a model call trace written with --trace')
+    parser.add_argument('trace', type=str,
+                        help='JSONL trace file')
+    parser.add_argument('--price_prompt', type=float, default=None,
+                        help='USD per million prompt tokens, for the cost estimate (optional)')
+    parser.add_argument('--price_completion', type=float, default=None,
+                        help='USD per million completion tokens, for the cost estimate (optional)')
+    parser.add_argument('--price_cached', type=float, default=None,
+                        help='USD per million cached prompt tokens (default: --price_prompt)')
+
+    args = parser.parse_args(argv)
+    report = Tracer.load(args.trace).report(args.price_prompt, args.price_completion, args.price_cached)
+    print(report or f"No model calls recorded in {args.trace}")
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Offline structure analysis of world trees.
+
+A TreeIndex walks a world tree once, without calling a model, and records
+for every plot node its shortest path and depth from the root, its
+branching factor, the decisions left until the episode ends, its ending
+label, and the set of outcomes reachable from it: goal achievement labels
+of the endings below it, and None where an episode can get stuck at a node
+without choices. It also flags malformed nodes:
+
+    missing root     the tree has no plot with cid 0
+    duplicate cid    several plots share a cid; only the first is used
+    missing target   a choice leads to a cid that does not exist
+    dead end         a plot that is not an ending has no choices
+    unlabelled       an ending without a goal achievement label
+    cycle            a choice leads back to a plot on the way to it
+    unreachable      no path from the root leads to the plot
+
+Nodes whose outcome is the same whichever way the episode continues are
+determined: with --skip_forced, run_gae ends an episode as soon as it
+reaches one, and follows single-choice nodes without asking the model.
+
+Usage:
+    python tree_util.py --data_path <path_to_data> [--lang cn] [--output index.json]
+"""
+
+import argparse
+import json
+from collections import Counter, deque
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from data_util import iter_entries
+from log_util import add_logging_arguments, apply_logging_arguments, logger
+from worldtree import WorldTree
+
+
+class NodeInfo:
+    """Structure of the tree below (and the path to) one plot node."""
+
+    def __init__(self, cid: int):
+        self.cid = cid
+        self.kind = 'missing'  # 'decision', 'ending', 'dead_end' or 'missing'
+        self.label: Optional[int] = None  # Goal achievement of an ending
+        self.branching = 0
+        self.depth: Optional[int] = None  # Decisions from the root; None if unreachable
+        self.path: Optional[Tuple[int, ...]] = None  # A shortest path from the root
+        self.min_steps = 0  # Decisions left until the episode ends
+        self.max_steps = 0
+        self.paths = 1  # Distinct ways to continue from here to the end
+        self.outcomes: FrozenSet[Optional[int]] = frozenset()
+        self.cyclic = False  # Some continuation runs into a cycle
+        self.issues: List[str] = []
+
+    @property
+    def determined(self) -> bool:
+        """Whether every continuation from here has the same outcome."""
+        return not self.cyclic and len(self.outcomes) == 1
+
+    @property
+    def outcome(self) -> Optional[int]:
+        """The outcome of a determined node (None for an episode that gets stuck)."""
+        return next(iter(self.outcomes))
+
+    @property
+    def forced(self) -> bool:
+        """Whether the model's answer at this decision node cannot change the episode's outcome."""
+        return self.kind == 'decision' and (self.determined or (self.branching == 1 and not self.cyclic))
+
+    def to_dict(self) -> Dict:
+        return {
+            'kind': self.kind,
+            'label': self.label,
+            'branching': self.branching,
+            'depth': self.depth,
+            'path': list(self.path) if self.path is not None else None,
+            'steps': [self.min_steps, self.max_steps],
+            'paths': self.paths,
+            'outcomes': sorted(self.outcomes, key=lambda o: (o is None, o)),
+            'cyclic': self.cyclic,
+            'forced': self.forced,
+            'issues': self.issues,
+        }
+
+
+class TreeIndex:
+    """Per-node structure of a world tree, computed without a model."""
+
+    def __init__(self, tree: WorldTree):
+        self.tree = tree
+        self.issues: List[str] = []
+        self.nodes: Dict[int, NodeInfo] = {cid: NodeInfo(cid) for cid in tree.nodes}
+
+        cids = Counter(plot['cid'] for plot in tree.data['interactive_plot'])
+        for cid, count in cids.items():
+            if count > 1:
+                self.nodes[cid].issues.append(f"duplicate cid ({count} plots)")
+        if 0 not in tree.nodes:
+            self.issues.append("missing root (cid 0)")
+            return
+
+        self._depths()
+        # From the root first, so cycles are reported where an episode would run into them
+        visited = set()
+        for cid in [0] + list(self.nodes):
+            self._visit(cid, visited, set())
+        for info in self.nodes.values():
+            if info.depth is None and info.kind != 'missing':
+                info.issues.append("unreachable")
+
+    def _depths(self) -> None:
+        """Breadth-first shortest paths from the root."""
+        self.nodes[0].depth, self.nodes[0].path = 0, (0,)
+        queue = deque([0])
+        while queue:
+            info = self.nodes[queue.popleft()]
+            node = self.tree.node(info.cid)
+            for cid in (node.nexts if node is not None else []):
+                child = self.nodes.setdefault(cid, NodeInfo(cid))
+                if child.depth is None:
+                    child.depth, child.path = info.depth + 1, info.path + (cid,)
+                    queue.append(cid)
+
+    def _visit(self, cid: int, visited: set, stack: set) -> Optional[NodeInfo]:
+        """Fill in the outcomes below cid; None marks a choice leading back onto the stack."""
+        info = self.nodes.setdefault(cid, NodeInfo(cid))
+        if cid in visited:
+            return info
+        if cid in stack:
+            return None
+        node = self.tree.node(cid)
+        if node is None:
+            # An episode following a choice to a missing plot gets stuck there
+            info.outcomes = frozenset([None])
+        elif node.plot.get('type') == 'ending':
+            info.kind = 'ending'
+            if node.goal_achievement == -1:
+                info.issues.append("unlabelled ending")
+                info.outcomes = frozenset([None])
+            else:
+                info.label = node.goal_achievement
+                info.outcomes = frozenset([node.goal_achievement])
+        elif not node.nexts:
+            info.kind = 'dead_end'
+            info.issues.append("dead end: no choices")
+            info.outcomes = frozenset([None])
+        else:
+            info.kind = 'decision'
+            info.branching = len(node.nexts)
+            stack.add(cid)
+            children = []
+            for child_cid in node.nexts:
+                child = self._visit(child_cid, visited, stack)
+                if child is None:
+                    info.cyclic = True
+                    info.issues.append(f"cycle: choice back to cid {child_cid}")
+                    continue
+                if child.kind == 'missing':
+                    info.issues.append(f"missing target: cid {child_cid}")
+                children.append(child)
+            stack.discard(cid)
+            if children:
+                info.outcomes = frozenset().union(*(child.outcomes for child in children))
+                info.min_steps = 1 + min(child.min_steps for child in children)
+                info.max_steps = 1 + max(child.max_steps for child in children)
+                info.paths = sum(child.paths for child in children)
+                info.cyclic = info.cyclic or any(child.cyclic for child in children)
+        visited.add(cid)
+        return info
+
+    @property
+    def root(self) -> Optional[NodeInfo]:
+        return self.nodes.get(0) if not self.issues else None
+
+    def malformed(self) -> List[Tuple[Optional[int], str]]:
+        """(cid, issue) of every problem found; cid is None for problems of the whole tree."""
+        problems = [(None, issue) for issue in self.issues]
+        problems += [(info.cid, issue) for info in self.nodes.values() for issue in info.issues]
+        return problems
+
+    def stats(self) -> Dict:
+        """Structural statistics of the part of the tree reachable from the root."""
+        reachable = [info for info in self.nodes.values() if info.depth is not None and info.kind != 'missing']
+        decisions = [info for info in reachable if info.kind == 'decision']
+        root = self.root
+        return {
+            'nodes': len(self.tree.nodes),
+            'reachable': len(reachable),
+            'decisions': len(decisions),
+            'endings': Counter(info.label for info in reachable if info.kind == 'ending' and info.label is not None),
+            'dead_ends': sum(info.kind == 'dead_end' for info in reachable),
+            'forced': sum(info.forced for info in decisions),
+            'single_choice': sum(info.branching == 1 for info in decisions),
+            'branching': sum(info.branching for info in decisions) / len(decisions) if decisions else 0.0,
+            'max_depth': max((info.depth for info in reachable), default=0),
+            'steps': [root.min_steps, root.max_steps] if root else None,
+            'paths': root.paths if root else 0,
+            'outcomes': sorted(root.outcomes, key=lambda o: (o is None, o)) if root else [],
+            'determined': root.determined if root else False,
+            'malformed': len(self.malformed()),
+        }
+
+    def to_dict(self) -> Dict:
+        stats = self.stats()
+        return {
+            'category': self.tree.category,
+            'issues': self.issues,
+            'stats': {**stats, 'endings': dict(stats['endings'])},
+            'nodes': {str(cid): info.to_dict() for cid, info in sorted(self.nodes.items())},
+        }
+
+
+def analyze_dataset(data_path: str, lang: str = 'cn', data_ids: Optional[List[str]] = None) -> Dict:
+    """
+    Index every world tree of a data file.
+
+    Returns:
+        Dict with 'trees' (data_id -> TreeIndex.to_dict()) and 'errors'
+        (data_id -> message for entries that could not be loaded)
+    """
+    trees, errors = {}, {}
+    for entry in iter_entries(data_path, lang, data_ids):
+        data_id = entry.get('data_id', 'unknown')
+        data_key = f"{lang}_data"
+        if data_key not in entry:
+            errors[data_id] = f"{data_key} not found"
+            continue
+        try:
+            trees[data_id] = TreeIndex(WorldTree(entry[data_key])).to_dict()
+        except Exception as e:
+            errors[data_id] = str(e)
+    return {'trees': trees, 'errors': errors}
+
+
+def format_dataset_stats(analysis: Dict) -> str:
+    """Summarize an analyze_dataset result, listing the malformed nodes."""
+    stats = [tree['stats'] for tree in analysis['trees'].values()]
+    decisions = sum(s['decisions'] for s in stats)
+    endings = Counter()
+    for s in stats:
+        endings.update({int(label): count for label, count in s['endings'].items()})
+    steps = [s['steps'][1] for s in stats if s['steps']]
+    lines = [
+        f"World trees: {len(stats)} ({len(analysis['errors'])} could not be loaded)",
+        f"Nodes: {sum(s['nodes'] for s in stats)}, reachable {sum(s['reachable'] for s in stats)}, "
+        f"{decisions} decisions, {sum(endings.values())} endings, {sum(s['dead_ends'] for s in stats)} dead ends",
+        "Endings by goal achievement: " + ", ".join(f"{label}: {count}" for label, count in sorted(endings.items())),
+        f"Branching: {sum(s['branching'] * s['decisions'] for s in stats) / decisions if decisions else 0:.2f} "
+        f"choices per decision on average",
+        f"Decisions per episode: at most {max(steps, default=0)}, "
+        f"{sum(steps) / len(steps) if steps else 0:.1f} on average over the longest path of each tree",
+        f"Root-to-end paths: {sum(s['paths'] for s in stats)}",
+        f"Forced decisions: {sum(s['forced'] for s in stats)} of {decisions} "
+        f"({sum(s['single_choice'] for s in stats)} single-choice)",
+        f"Trees with a determined outcome: {sum(s['determined'] for s in stats)}",
+    ]
+    problems = [(data_id, cid, issue) for data_id, tree in analysis['trees'].items()
+                for cid, issue in [(None, issue) for issue in tree['issues']]
+                + [(cid, issue) for cid, node in tree['nodes'].items() for issue in node['issues']]]
+    problems += [(data_id, None, error) for data_id, error in analysis['errors'].items()]
+    lines.append(f"Malformed: {len(problems)}")
+    lines += [f"  {data_id}" + (f" cid {cid}" if cid is not None else "") + f": {issue}"
+              for data_id, cid, issue in problems]
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Index world trees offline: paths, depths, reachable outcomes, '
+                                                 'malformed nodes and dataset statistics')
+    parser.add_argument('--data_path', type=str, required=True,
+                        help='Path to worldtree data file')
+    parser.add_argument('--lang', type=str, default='cn', choices=['cn', 'en'],
+                        help='Language to analyze (cn for Chinese, en for English)')
+    parser.add_argument('--data_ids', type=str, default=None,
+                        help='Comma-separated data_ids to analyze (optional, default: all)')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Output file to save the per-node index (optional)')
+    add_logging_arguments(parser)
+
+    args = parser.parse_args(argv)
+    apply_logging_arguments(args)
+
+    try:
+        analysis = analyze_dataset(args.data_path, args.lang, args.data_ids.split(',') if args.data_ids else None)
+        print(format_dataset_stats(analysis))
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(analysis, f, indent=2, ensure_ascii=False)
+            logger.info("Index saved to %s", args.output)
+    except Exception as e:
+        logger.error("Error during analysis: %s", e)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,238 @@
+"""
+Indexed world tree representation for Goal Achievement Evaluation.
+
+A WorldTree preprocesses one language-specific worldtree entry once: plots
+are indexed by cid, each node's dialogue lines, introduced characters and
+choices are precomputed, and the dialogue/profile prefix for every visited
+path is cached, so advancing an episode by one plot does not rescan the
+plot list or rebuild the context from the root. EpisodeState follows a
+single episode and extends its context in place as the path grows.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def simple_profile(profile: Dict) -> Dict:
+    """Simplify profile format."""
+    return {
+        "name": profile.get("name"),
+        "public": profile.get("public profile"),
+        "private": profile.get("private profile"), 
+        "goal": profile.get("goal"),
+    }
+
+
+def simple_other_profiles(profiles: List[Dict]) -> List[Dict]:
+    """Simplify other character profiles format."""
+    return [{"name": profile["name"], "public": profile.get("public profile", "")} for profile in profiles]
+
+
+def profile_line(profile: Dict) -> str:
+    """Format a character profile as shown in the other-characters prompt section."""
+    return f"{profile['name']}: {profile['public']}"
+
+
+class PlotNode:
+    """Precomputed view of a single plot in a world tree."""
+
+    def __init__(self, plot: Dict):
+        self.cid = plot["cid"]
+        self.plot = plot
+
+        # Dialogue lines and character profiles introduced by this plot
+        self.dialogue = ""
+        self.profiles = []
+        for d in plot.get("dialog", []):
+            if "profile" in d:
+                self.profiles.append(simple_profile(d["profile"]))
+            if "content" in d:
+                role = d.get("role", "旁白")
+                self.dialogue += f"{role}: {d['content']}\n"
+
+        # Outgoing choices, or the ending label
+        self.choices = []
+        self.nexts = []
+        self.goal_achievement = -1
+        if plot.get("type") == "ending":
+            self.goal_achievement = plot.get("goal achievement", -1)
+        else:
+            for choice in plot.get("choices", []):
+                self.nexts.append(choice["cid"])
+                content = choice.get("content", {})
+                self.choices.append(f"{content.get('role', '')}: {content.get('content', '')}")
+
+        self.profile_lines = [profile_line(p) for p in self.profiles]
+
+
+class WorldTree:
+    """A world tree with a cid index and cached per-path dialogue prefixes."""
+
+    def __init__(self, data: Dict):
+        """
+        Args:
+            data: The language-specific world tree data
+        """
+        self.data = data
+        profiles = data["predefined_profiles"]
+        self.category = str(profiles[0]["orientation"])
+        self.main_profile = simple_profile(profiles[0])
+        self.main_str = (
+            f"主角档案:\n名字: {self.main_profile['name']}\n公开信息: {self.main_profile['public']}\n"
+            f"隐私信息: {self.main_profile['private']}\n社交目标: {self.main_profile['goal']}"
+        )
+        self.root_profiles = simple_other_profiles(profiles[1:])
+
+        # Index plots by cid; the first plot with a given cid wins
+        self.nodes: Dict[int, PlotNode] = {}
+        for plot in data["interactive_plot"]:
+            if plot["cid"] not in self.nodes:
+                self.nodes[plot["cid"]] = PlotNode(plot)
+
+        self._index = None
+        # path -> (dialogue, other profile lines)
+        self._prefixes: Dict[Tuple[int, ...], Tuple[str, Tuple[str, ...]]] = {
+            (): ("", tuple(dict.fromkeys(profile_line(p) for p in self.root_profiles)))
+        }
+
+    def node(self, cid: int) -> Optional[PlotNode]:
+        """Return the plot node for cid, or None if the tree has no such plot."""
+        return self.nodes.get(cid)
+
+    @property
+    def index(self):
+        """Structural index of the tree (tree_util.TreeIndex), built on first use."""
+        if self._index is None:
+            from tree_util import TreeIndex
+            self._index = TreeIndex(self)
+        return self._index
+
+    def prefix(self, path: Sequence[int]) -> Tuple[str, Tuple[str, ...]]:
+        """
+        Return the dialogue and other-character profile lines accumulated along path.
+
+        Profile lines are deduplicated, keeping the first occurrence. The
+        result for every prefix of path is cached, so extending an already
+        visited path by one cid only appends that plot's contribution.
+        """
+        key = tuple(path)
+        cached = self._prefixes.get(key)
+        if cached is not None:
+            return cached
+
+        # Find the longest cached prefix, then extend it one plot at a time
+        depth = len(key) - 1
+        while key[:depth] not in self._prefixes:
+            depth -= 1
+        dialogue, profiles = self._prefixes[key[:depth]]
+        # Ordered set of the profile lines, as in EpisodeState.advance
+        seen = dict.fromkeys(profiles)
+        for i in range(depth, len(key)):
+            node = self.nodes.get(key[i])
+            # Unknown cids contribute nothing to the context
+            if node is not None:
+                dialogue += node.dialogue
+                size = len(seen)
+                for line in node.profile_lines:
+                    if line not in seen:
+                        seen[line] = None
+                if len(seen) != size:
+                    profiles = tuple(seen)
+            self._prefixes[key[:i + 1]] = (dialogue, profiles)
+        return dialogue, profiles
+
+    def state(self, path: Sequence[int]) -> Tuple:
+        """
+        Return the interface state after following path.
+
+        Returns:
+            Tuple of (main_profile, main_str, other_profiles, dialogue, choices, nexts,
+            goal_achievement, category), as returned by run_gae.get_interface_state
+        """
+        dialogue, profiles = self.prefix(path)
+        node = self.nodes.get(path[-1])
+        choices = node.choices if node is not None else []
+        nexts = node.nexts if node is not None else []
+        goal_achievement = node.goal_achievement if node is not None else -1
+        return (
+            self.main_profile,
+            self.main_str,
+            "\n".join(profiles),
+            dialogue,
+            list(choices),
+            list(nexts),
+            goal_achievement,
+            self.category,
+        )
+
+
+class EpisodeState:
+    """
+    Mutable state of one episode through a world tree.
+
+    The dialogue is kept as a list of per-plot segments and only joined when
+    a prompt needs it, and the other-character profiles are kept as an
+    ordered, deduplicated set, so advancing one step costs only the new plot.
+    """
+
+    def __init__(self, tree: WorldTree, path: Sequence[int] = (0,)):
+        """
+        Args:
+            tree: The world tree being played
+            path: Initial path of cids, starting from the root by default
+        """
+        self.tree = tree
+        self.path: List[int] = []
+        self._segments: List[str] = []
+        self._profiles: Dict[str, None] = dict.fromkeys(profile_line(p) for p in tree.root_profiles)
+        self._dialogue: Optional[str] = ""
+        self._others: Optional[str] = None
+        for cid in path:
+            self.advance(cid)
+
+    def advance(self, cid: int) -> None:
+        """Append cid to the path and add its plot to the context."""
+        self.path.append(cid)
+        node = self.tree.node(cid)
+        # Unknown cids contribute nothing to the context
+        if node is None:
+            return
+        if node.dialogue:
+            self._segments.append(node.dialogue)
+            self._dialogue = None
+        for line in node.profile_lines:
+            if line not in self._profiles:
+                self._profiles[line] = None
+                self._others = None
+
+    @property
+    def node(self) -> Optional[PlotNode]:
+        """The plot node at the end of the path."""
+        return self.tree.node(self.path[-1])
+
+    @property
+    def dialogue(self) -> str:
+        """The dialogue accumulated along the path."""
+        if self._dialogue is None:
+            self._dialogue = "".join(self._segments)
+        return self._dialogue
+
+    @property
+    def other_profiles(self) -> str:
+        """The other-character profile lines accumulated along the path."""
+        if self._others is None:
+            self._others = "\n".join(self._profiles)
+        return self._others
+
+    def state(self) -> Tuple:
+        """Return the interface state in the same layout as WorldTree.state."""
+        node = self.node
+        return (
+            self.tree.main_profile,
+            self.tree.main_str,
+            self.other_profiles,
+            self.dialogue,
+            list(node.choices) if node is not None else [],
+            list(node.nexts) if node is not None else [],
+            node.goal_achievement if node is not None else -1,
+            self.tree.category,
+        )